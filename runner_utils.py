@@ -0,0 +1,15 @@
+"""
+Helpers shared by the test runner scripts.
+"""
+
+import os
+from pathlib import Path
+from typing import Iterator
+
+
+def iter_java(root: Path) -> Iterator[Path]:
+    """Yield the .java files directly in root, using one scandir pass."""
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False) and entry.name.endswith(".java"):
+                yield Path(entry.path)
@@ -0,0 +1,84 @@
+"""
+Message Batches API driver for Claude pattern migrations.
+Submits every file's prompt as one batch job (half the per-token price,
+processed in parallel server-side) and demultiplexes the results.
+"""
+
+import logging
+import time
+
+import anthropic
+from anthropic.types.message_create_params import MessageCreateParamsNonStreaming
+from anthropic.types.messages.batch_create_params import Request
+
+from src.claude_fixer import _get_client, _message_params, _usage_tokens
+
+logger = logging.getLogger(__name__)
+
+_POLL_INTERVAL_SECONDS = 10
+
+
+def run_batch(prompts: dict[str, str | list[dict]]) -> dict[str, tuple[bool, str, int]]:
+    """
+    Submit prompts as a single Message Batch and wait for it to end.
+
+    Args:
+        prompts: custom_id -> prompt content (text or content blocks).
+            IDs must match ^[a-zA-Z0-9_-]{1,64}$.
+
+    Returns:
+        custom_id -> (success, response_text_or_error, tokens_used)
+    """
+    if not prompts:
+        return {}
+
+    client = _get_client()
+    requests = [
+        Request(
+            custom_id=custom_id,
+            params=MessageCreateParamsNonStreaming(**_message_params(prompt)),
+        )
+        for custom_id, prompt in prompts.items()
+    ]
+
+    try:
+        batch = client.messages.batches.create(requests=requests)
+        logger.info("Submitted message batch %s (%d request(s))", batch.id, len(requests))
+
+        while batch.processing_status != "ended":
+            time.sleep(_POLL_INTERVAL_SECONDS)
+            batch = client.messages.batches.retrieve(batch.id)
+            logger.debug(
+                "Batch %s: %d processing, %d succeeded, %d errored",
+                batch.id,
+                batch.request_counts.processing,
+                batch.request_counts.succeeded,
+                batch.request_counts.errored,
+            )
+
+        results = {
+            custom_id: (False, "No result returned for batch request", 0)
+            for custom_id in prompts
+        }
+        for entry in client.messages.batches.results(batch.id):
+            if entry.result.type == "succeeded":
+                message = entry.result.message
+                results[entry.custom_id] = (
+                    True,
+                    message.content[0].text,
+                    _usage_tokens(message.usage),
+                )
+            else:
+                results[entry.custom_id] = (
+                    False,
+                    f"Batch request {entry.result.type}",
+                    0,
+                )
+    except anthropic.APIError as exc:
+        msg = f"Claude batch API error: {exc}"
+        logger.error(msg)
+        return {custom_id: (False, msg, 0) for custom_id in prompts}
+
+    total_tokens = sum(tokens for _, _, tokens in results.values())
+    logger.info("Message batch %s ended: %d tokens", batch.id, total_tokens)
+    return results
@@ -3,16 +3,21 @@ Claude API integration for complex code transformations.
 Currently handles Spring Security config migration only.
 """
 
+import asyncio
+import functools
 import logging
+import os
 import re
 import shutil
 from pathlib import Path
+from typing import Awaitable, Callable
 
 import anthropic
-from tree_sitter import Language, Parser, Query, QueryCursor
+from tree_sitter import Language, Parser, Query, QueryCursor, Tree
 import tree_sitter_java
 
 from src.config import ANTHROPIC_API_KEY, CLAUDE_MODEL
+from src.parse_cache import ParseCache
 
 logger = logging.getLogger(__name__)
 
@@ -32,18 +37,51 @@ _SECURITY_CONFIG_QUERY = Query(
     ) @class
     """,
 )
+# captures() resets the cursor on every call, so one instance serves all files
+_SECURITY_CONFIG_CURSOR = QueryCursor(_SECURITY_CONFIG_QUERY)
 
 # --- Claude prompt ---
 
 _PROMPTS_DIR = Path(__file__).resolve().parent.parent / "prompts"
 
 
+# Every template ends with the per-file section introduced by this phrase.
+# Everything before it is identical across files and sits behind a cache
+# breakpoint so repeat calls bill the rules at the cached-input rate.
+_FILE_SECTION_MARKER = "Here is the original"
+
+
+@functools.lru_cache(maxsize=None)
 def _load_prompt(name: str) -> str:
-    """Load a prompt template from the prompts/ directory."""
+    """Load a prompt template from the prompts/ directory (read once per name)."""
     return (_PROMPTS_DIR / name).read_text(encoding="utf-8")
 
 
+def _split_template(template: str) -> tuple[str, str]:
+    """Split a prompt template into (static rules, per-file section)."""
+    static, marker, file_section = template.partition(_FILE_SECTION_MARKER)
+    if not marker:
+        raise ValueError(f"Prompt template has no '{_FILE_SECTION_MARKER}' section")
+    return static, marker + file_section
+
+
+def _cached_prompt(static: str, file_section: str) -> list[dict]:
+    """Build message content with the static rules marked for prompt caching."""
+    return [
+        {"type": "text", "text": static, "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": file_section},
+    ]
+
+
 SECURITY_MIGRATION_PROMPT = _load_prompt("security_filterchain.txt")
+_SECURITY_STATIC, _SECURITY_FILE_SECTION = _split_template(SECURITY_MIGRATION_PROMPT)
+
+# Multi-file prompts: replaces a template's per-file section so several small
+# files share one call (and one copy of the rules).
+_MULTI_FILE_SECTION = _load_prompt("multi_file.txt")
+_OUT_BLOCK_RE = re.compile(r"<<<OUT id=(\d+)>>>\n?(.*?)<<<END>>>", re.DOTALL)
+# Non-streaming requests must stay well under the SDK's long-request limit
+_MAX_MULTI_FILE_OUTPUT_TOKENS = 16000
 
 # --- API client (lazy init) ---
 
@@ -57,33 +95,45 @@ def _get_client() -> anthropic.Anthropic:
     return _client
 
 
+_async_client: anthropic.AsyncAnthropic | None = None
+
+
+def _get_async_client() -> anthropic.AsyncAnthropic:
+    global _async_client
+    if _async_client is None:
+        _async_client = anthropic.AsyncAnthropic(api_key=ANTHROPIC_API_KEY)
+    return _async_client
+
+
 # --- Public functions ---
 
 
-def find_security_configs(project_path: Path) -> list[Path]:
+def _has_security_config(source: bytes, get_tree: Callable[[], Tree]) -> bool:
+    """Check whether a Java file declares a WebSecurityConfigurerAdapter subclass."""
+    # The superclass name must appear literally, so most files never need a parse
+    if b"WebSecurityConfigurerAdapter" not in source:
+        return False
+    captures = _SECURITY_CONFIG_CURSOR.captures(get_tree().root_node)
+    return bool(captures.get("class"))
+
+
+def find_security_configs(project_path: Path, cache: ParseCache | None = None) -> list[Path]:
     """
     Find all Java files extending WebSecurityConfigurerAdapter.
 
+    Args:
+        project_path: Project root to scan
+        cache: Shared parse cache; one is built for this call if omitted
+
     Returns:
         List of file paths containing Security configs.
     """
-    project_path = project_path.resolve()
-    results: list[Path] = []
-
-    for java_file in project_path.rglob("*.java"):
-        try:
-            source = java_file.read_bytes()
-        except OSError as exc:
-            logger.warning("Could not read %s: %s", java_file, exc)
-            continue
-
-        tree = _parser.parse(source)
-        cursor = QueryCursor(_SECURITY_CONFIG_QUERY)
-        captures = cursor.captures(tree.root_node)
-
-        if captures.get("class"):
-            results.append(java_file)
-            logger.debug("Found Security config: %s", java_file)
+    if cache is None:
+        cache = ParseCache()
+        cache.populate(project_path)
+    results = cache.scan("security", _has_security_config)
+    for java_file in results:
+        logger.debug("Found Security config: %s", java_file)
 
     logger.info(
         "Found %d WebSecurityConfigurerAdapter class(es) in %s",
@@ -95,24 +145,254 @@ def find_security_configs(project_path: Path) -> list[Path]:
 
 def _extract_code_from_response(text: str) -> str:
     """Extract Java code from Claude's response, stripping markdown fences."""
-    # Try to extract from ```java ... ``` block
-    match = re.search(r"```java\s*\n(.*?)```", text, re.DOTALL)
-    if match:
-        return match.group(1).strip()
-    # Try generic ``` block
-    match = re.search(r"```\s*\n(.*?)```", text, re.DOTALL)
-    if match:
-        return match.group(1).strip()
+    # Try a ```java ... ``` block, then a generic ``` ... ``` block. The opening
+    # fence line may only carry trailing whitespace after the opener.
+    for opener in ("```java", "```"):
+        pos = 0
+        while (start := text.find(opener, pos)) >= 0:
+            body_start = text.find("\n", start) + 1
+            if not body_start:
+                break
+            if not text[start + len(opener):body_start].isspace():
+                pos = start + 1
+                continue
+            end = text.find("```", body_start)
+            if end < 0:
+                break
+            return text[body_start:end].strip()
     # Assume the whole response is code
     return text.strip()
 
 
+# Shorter responses cannot be a migrated source file, so skip parsing them
+_MIN_JAVA_LENGTH = 20
+
+
 def _validate_java_syntax(code: str) -> bool:
     """Check that code parses as valid Java (no ERROR nodes)."""
+    if len(code) < _MIN_JAVA_LENGTH:
+        return False
     tree = _parser.parse(code.encode("utf-8"))
     return not tree.root_node.has_error
 
 
+@functools.lru_cache(maxsize=1024)
+def _validate_java_syntax_cached(code: str) -> bool:
+    """Memoized _validate_java_syntax for responses that repeat across calls."""
+    return _validate_java_syntax(code)
+
+
+def _message_params(prompt: str | list[dict], max_tokens: int = 4000) -> dict:
+    """Build the Messages API parameters shared by every migration call."""
+    return {
+        "model": CLAUDE_MODEL,
+        "max_tokens": max_tokens,
+        "temperature": 0.0,
+        "messages": [{"role": "user", "content": prompt}],
+    }
+
+
+def _usage_tokens(usage) -> int:
+    """Total tokens processed for a response, including cache writes and reads."""
+    return (
+        usage.input_tokens
+        + (usage.cache_creation_input_tokens or 0)
+        + (usage.cache_read_input_tokens or 0)
+        + usage.output_tokens
+    )
+
+
+def _log_usage(usage) -> int:
+    """Log a response's token usage and return the total tokens used."""
+    tokens_total = _usage_tokens(usage)
+    logger.info(
+        "Claude response: %d input tokens, %d output tokens (%d total)",
+        usage.input_tokens,
+        usage.output_tokens,
+        tokens_total,
+    )
+    logger.debug(
+        "Prompt cache: %d tokens read, %d tokens written",
+        usage.cache_read_input_tokens or 0,
+        usage.cache_creation_input_tokens or 0,
+    )
+    return tokens_total
+
+
+def _call_claude(prompt: str | list[dict], max_tokens: int = 4000) -> tuple[bool, str, int]:
+    """
+    Send a single migration prompt to Claude.
+
+    Returns:
+        (success: bool, response_text_or_error: str, tokens_used: int)
+    """
+    client = _get_client()
+    try:
+        response = client.messages.create(**_message_params(prompt, max_tokens))
+    except anthropic.APIError as exc:
+        msg = f"Claude API error: {exc}"
+        logger.error(msg)
+        return False, msg, 0
+
+    return True, response.content[0].text, _log_usage(response.usage)
+
+
+async def _call_claude_async(
+    prompt: str | list[dict], max_tokens: int = 4000
+) -> tuple[bool, str, int]:
+    """Async variant of _call_claude() using the shared AsyncAnthropic client."""
+    client = _get_async_client()
+    try:
+        response = await client.messages.create(**_message_params(prompt, max_tokens))
+    except anthropic.APIError as exc:
+        msg = f"Claude API error: {exc}"
+        logger.error(msg)
+        return False, msg, 0
+
+    return True, response.content[0].text, _log_usage(response.usage)
+
+
+# Claude requests in flight at once, to stay inside the API rate limits
+MAX_CONCURRENT_CALLS = 10
+
+
+def _process_java_response(text: str) -> tuple[bool, str]:
+    """
+    Extract Java code from a Claude response and check its syntax.
+
+    Returns:
+        (success: bool, migrated_code_or_error: str)
+    """
+    migrated_code = _extract_code_from_response(text)
+
+    if not _validate_java_syntax_cached(migrated_code):
+        msg = "Claude-generated code has Java syntax errors"
+        logger.error(msg)
+        logger.debug("Generated code:\n%s", migrated_code)
+        return False, msg
+
+    return True, migrated_code
+
+
+def _build_multi_file_prompt(static: str, files: list[tuple[str, str]]) -> list[dict]:
+    """Build a prompt carrying several (file_name, content) pairs under one rule set."""
+    file_blocks = "\n".join(
+        f"<<<FILE id={i} name={name}>>>\n{content}\n<<<END>>>"
+        for i, (name, content) in enumerate(files)
+    )
+    return _cached_prompt(
+        static,
+        (_MULTI_FILE_SECTION
+         .replace("{file_count}", str(len(files)))
+         .replace("{file_blocks}", file_blocks)),
+    )
+
+
+async def _migrate_files_batched(
+    file_paths: list[Path],
+    batch_size: int,
+    static: str,
+    process_response: Callable[[str], tuple[bool, str]],
+    migrate_single: Callable[[Path], Awaitable[tuple[bool, str, int]]],
+    semaphore: asyncio.Semaphore | None = None,
+) -> list[tuple[bool, str, int]]:
+    """
+    Migrate files up to batch_size per Claude call, with calls running concurrently.
+
+    Every request, multi-file or single, holds a slot of `semaphore` while it
+    is in flight; pass one semaphore to several calls to share a single limit
+    (by default each call gets its own, of MAX_CONCURRENT_CALLS slots).
+
+    Output quality degrades as batches grow, so any file whose output block is
+    missing or fails post-processing is retried on its own via migrate_single
+    (a chunk's retries run concurrently). If the multi-file call itself fails,
+    its files all report that error rather than being resent one by one.
+    A call's tokens are split evenly across the files it carried.
+
+    Returns:
+        One (success, migrated_content_or_error, tokens_used) per input path.
+    """
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_CALLS)
+
+    async def single(path: Path) -> tuple[bool, str, int]:
+        async with semaphore:
+            return await migrate_single(path)
+
+    async def migrate_chunk(chunk: list[Path]) -> list[tuple[bool, str, int]]:
+        if len(chunk) == 1:
+            return [await single(chunk[0])]
+
+        chunk_results: dict[int, tuple[bool, str, int]] = {}
+        readable: list[tuple[int, Path, str]] = []
+        for i, path in enumerate(chunk):
+            try:
+                readable.append((i, path, path.read_text(encoding="utf-8")))
+            except OSError as exc:
+                msg = f"Could not read {path}: {exc}"
+                logger.error(msg)
+                chunk_results[i] = (False, msg, 0)
+
+        if readable:
+            prompt = _build_multi_file_prompt(
+                static, [(path.name, content) for _, path, content in readable]
+            )
+            max_tokens = min(4000 * len(readable), _MAX_MULTI_FILE_OUTPUT_TOKENS)
+            logger.info("Calling Claude to migrate %d files in one prompt", len(readable))
+            async with semaphore:
+                ok, text, tokens = await _call_claude_async(prompt, max_tokens=max_tokens)
+            if not ok:
+                # The call itself failed (rate limit, overload, ...); resending
+                # every file alone would add load while the API is pushing back
+                for i, _, _ in readable:
+                    chunk_results[i] = (False, text, 0)
+                return [chunk_results[i] for i in range(len(chunk))]
+
+            outputs = {
+                int(m.group(1)): m.group(2) for m in _OUT_BLOCK_RE.finditer(text)
+            }
+            share, extra = divmod(tokens, len(readable))
+            retries: list[tuple[int, Path, int]] = []
+            for block_id, (i, path, _) in enumerate(readable):
+                spent = share + (extra if block_id == 0 else 0)
+                migrated_ok, migrated = False, ""
+                if block_id in outputs:
+                    migrated_ok, migrated = process_response(outputs[block_id])
+                if migrated_ok:
+                    chunk_results[i] = (True, migrated, spent)
+                else:
+                    logger.warning("No valid batched output for %s; retrying alone", path.name)
+                    retries.append((i, path, spent))
+
+            # Retries are independent, so a truncated response costs one more
+            # round trip rather than one per missing block
+            retried = await asyncio.gather(*(single(path) for _, path, _ in retries))
+            for (i, _, spent), (single_ok, single_content, single_tokens) in zip(retries, retried):
+                chunk_results[i] = (single_ok, single_content, spent + single_tokens)
+
+        return [chunk_results[i] for i in range(len(chunk))]
+
+    chunks = [
+        file_paths[start:start + batch_size]
+        for start in range(0, len(file_paths), batch_size)
+    ]
+    chunk_results = await asyncio.gather(*(migrate_chunk(chunk) for chunk in chunks))
+    return [result for chunk in chunk_results for result in chunk]
+
+
+def build_security_prompt(original_code: str) -> list[dict]:
+    """Build the Claude prompt for a Security config."""
+    return _cached_prompt(
+        _SECURITY_STATIC,
+        _SECURITY_FILE_SECTION.replace("{original_code}", original_code),
+    )
+
+
+def process_security_response(text: str) -> tuple[bool, str]:
+    """Post-process Claude's answer to a Security config prompt."""
+    return _process_java_response(text)
+
+
 def migrate_security_config(file_path: Path) -> tuple[bool, str, int]:
     """
     Use Claude to migrate a Spring Security config from 2.x to 3.x pattern.
@@ -120,7 +400,6 @@ def migrate_security_config(file_path: Path) -> tuple[bool, str, int]:
     Returns:
         (success: bool, migrated_code_or_error: str, tokens_used: int)
     """
-    file_path = file_path.resolve()
     try:
         original_code = file_path.read_text(encoding="utf-8")
     except OSError as exc:
@@ -128,70 +407,131 @@ def migrate_security_config(file_path: Path) -> tuple[bool, str, int]:
         logger.error(msg)
         return False, msg, 0
 
-    prompt = SECURITY_MIGRATION_PROMPT.replace("{original_code}", original_code)
-    client = _get_client()
+    return migrate_security_config_text(file_path.name, original_code)
+
+
+def migrate_security_config_text(name: str, original_code: str) -> tuple[bool, str, int]:
+    """migrate_security_config() for source already in memory; name is for logging."""
+    logger.info("Calling Claude to migrate: %s", name)
+    ok, text, tokens_total = _call_claude(build_security_prompt(original_code))
+    if not ok:
+        return False, text, tokens_total
 
-    logger.info("Calling Claude to migrate: %s", file_path.name)
+    ok, migrated_code = process_security_response(text)
+    return ok, migrated_code, tokens_total
+
+
+async def migrate_security_config_async(file_path: Path) -> tuple[bool, str, int]:
+    """Async variant of migrate_security_config()."""
     try:
-        response = client.messages.create(
-            model=CLAUDE_MODEL,
-            max_tokens=4000,
-            temperature=0.0,
-            messages=[{"role": "user", "content": prompt}],
-        )
-    except anthropic.APIError as exc:
-        msg = f"Claude API error: {exc}"
+        original_code = file_path.read_text(encoding="utf-8")
+    except OSError as exc:
+        msg = f"Could not read {file_path}: {exc}"
         logger.error(msg)
         return False, msg, 0
 
-    tokens_in = response.usage.input_tokens
-    tokens_out = response.usage.output_tokens
-    tokens_total = tokens_in + tokens_out
-    logger.info(
-        "Claude response: %d input tokens, %d output tokens (%d total)",
-        tokens_in,
-        tokens_out,
-        tokens_total,
+    return await migrate_security_config_text_async(file_path.name, original_code)
+
+
+async def migrate_security_config_text_async(
+    name: str, original_code: str
+) -> tuple[bool, str, int]:
+    """Async variant of migrate_security_config_text()."""
+    logger.info("Calling Claude to migrate: %s", name)
+    ok, text, tokens_total = await _call_claude_async(build_security_prompt(original_code))
+    if not ok:
+        return False, text, tokens_total
+
+    ok, migrated_code = process_security_response(text)
+    return ok, migrated_code, tokens_total
+
+
+async def migrate_security_batch(
+    file_paths: list[Path],
+    batch_size: int = 4,
+    semaphore: asyncio.Semaphore | None = None,
+) -> list[tuple[bool, str, int]]:
+    """
+    Migrate Security configs several per Claude call, retrying failures singly.
+
+    Security configs are the largest of the three patterns, so batches are
+    smaller: four files at 4000 output tokens each fill the multi-file cap.
+    `semaphore` is passed through to _migrate_files_batched.
+
+    Returns:
+        One (success, migrated_code_or_error, tokens_used) per input path.
+    """
+    return await _migrate_files_batched(
+        file_paths,
+        batch_size,
+        _SECURITY_STATIC,
+        process_security_response,
+        migrate_security_config_async,
+        semaphore,
     )
 
-    migrated_code = _extract_code_from_response(response.content[0].text)
 
-    if not _validate_java_syntax(migrated_code):
-        msg = "Claude-generated code has Java syntax errors"
-        logger.error(msg)
-        logger.debug("Generated code:\n%s", migrated_code)
-        return False, msg, tokens_total
+# Encoded content goes to disk in writes of this size
+_WRITE_CHUNK_BYTES = 1 << 16
 
-    return True, migrated_code, tokens_total
 
+def _atomic_write(path: Path, content: str) -> None:
+    """
+    Replace an existing file's contents via a sibling .tmp and os.replace.
 
-def write_migrated_file(file_path: Path, new_content: str) -> bool:
+    The content is encoded once and written with os.write in 64 KB chunks;
+    the file keeps its permission bits. A symlink is followed and its target
+    replaced, so the link survives. Raises OSError, leaving the original
+    untouched and no .tmp behind, if any step fails.
+    """
+    data = memoryview(content.encode("utf-8"))
+    path = Path(os.path.realpath(path))
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            while data:
+                data = data[os.write(fd, data[:_WRITE_CHUNK_BYTES]):]
+        finally:
+            os.close(fd)
+        shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def write_migrated_file(file_path: Path, new_content: str, backup: bool = True) -> bool:
     """
     Write migrated code to file with backup.
 
-    Creates a .bak file before overwriting.
+    The .bak is a hard link to the original (a copy across filesystems), and
+    the new content is swapped in by _atomic_write, so the original is never
+    modified in place and the backup keeps its bytes. A symlinked file is
+    backed up and rewritten at its target. Pass backup=False when an earlier
+    write in the same run already backed up the original.
     Returns success status.
     """
-    file_path = file_path.resolve()
+    file_path = Path(os.path.realpath(file_path))
     backup_path = file_path.with_suffix(file_path.suffix + ".bak")
 
-    try:
-        shutil.copy2(file_path, backup_path)
-        logger.debug("Backup created: %s", backup_path)
-    except OSError as exc:
-        logger.error("Failed to create backup for %s: %s", file_path, exc)
-        return False
+    if backup:
+        try:
+            backup_path.unlink(missing_ok=True)
+            try:
+                os.link(file_path, backup_path)
+            except OSError:
+                shutil.copy2(file_path, backup_path)
+            logger.debug("Backup created: %s", backup_path)
+        except OSError as exc:
+            logger.error("Failed to create backup for %s: %s", file_path, exc)
+            return False
 
     try:
-        file_path.write_text(new_content, encoding="utf-8")
+        _atomic_write(file_path, new_content)
         logger.info("Wrote migrated file: %s", file_path)
         return True
     except OSError as exc:
+        # The original is untouched until os.replace succeeds
         logger.error("Failed to write %s: %s", file_path, exc)
-        # Attempt to restore backup
-        try:
-            shutil.copy2(backup_path, file_path)
-            logger.info("Restored backup for %s", file_path)
-        except OSError:
-            logger.error("CRITICAL: Could not restore backup for %s", file_path)
         return False
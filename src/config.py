@@ -33,6 +33,16 @@ REWRITE_RECIPE_COORDINATES: str = (
     "org.openrewrite.recipe:rewrite-spring:RELEASE"
 )
 
+# Scan cache (SHA-256 of file contents -> detector results); empty disables it
+SCAN_CACHE_PATH: str = os.getenv(
+    "SCAN_CACHE_PATH",
+    str(Path.home() / ".cache" / "migration-mvp" / "scan_cache.sqlite"),
+)
+
+# Larger files are not sent to Claude: the migrated file must fit in one
+# max_tokens=4000 response, which holds about 20 KB of Java or config text
+MAX_MIGRATE_BYTES: int = int(os.getenv("MAX_MIGRATE_BYTES", "20000"))
+
 # Logging
 LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
 
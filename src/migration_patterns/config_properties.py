@@ -3,25 +3,25 @@ Config properties migration: application.properties / application.yml
 from Spring Boot 2.x to 3.x.
 """
 
+import asyncio
 import logging
+import re
 from pathlib import Path
 
-from src.claude_fixer import _get_client, _load_prompt, write_migrated_file
-from src.config import CLAUDE_MODEL
+from src.claude_fixer import (
+    _cached_prompt,
+    _call_claude,
+    _call_claude_async,
+    _load_prompt,
+    _migrate_files_batched,
+    _split_template,
+)
+from src.parse_cache import ParseCache, _walk_project
 
 logger = logging.getLogger(__name__)
 
 _CONFIG_PROMPT_TEMPLATE = _load_prompt("config_properties.txt")
-
-# File names we scan for
-_CONFIG_PATTERNS = [
-    "application.properties",
-    "application.yml",
-    "application.yaml",
-    "application-*.properties",
-    "application-*.yml",
-    "application-*.yaml",
-]
+_CONFIG_STATIC, _CONFIG_FILE_SECTION = _split_template(_CONFIG_PROMPT_TEMPLATE)
 
 # Deprecated Boot 2.x property prefixes/keys that signal migration is needed
 _DEPRECATED_MARKERS = [
@@ -43,25 +43,35 @@ _DEPRECATED_MARKERS = [
     "Oracle12cDialect",
     "SQLServer2012Dialect",
 ]
+# One left-to-right pass over the raw file bytes (markers are ASCII, so no
+# UTF-8 decode is needed) instead of one substring scan per marker
+_DEPRECATED_MARKER_RE = re.compile(
+    "|".join(map(re.escape, _DEPRECATED_MARKERS)).encode("ascii")
+)
 
 
-def find_config_files(project_path: Path) -> list[Path]:
-    """Find application config files that contain deprecated Boot 2.x properties."""
-    project_path = project_path.resolve()
+def find_config_files(project_path: Path, cache: ParseCache | None = None) -> list[Path]:
+    """
+    Find application config files that contain deprecated Boot 2.x properties.
+
+    A populated ParseCache already indexed the config files in its project
+    walk; without one, the tree is walked here.
+    """
     results: list[Path] = []
 
-    candidates: list[Path] = []
-    for pattern in _CONFIG_PATTERNS:
-        candidates.extend(project_path.rglob(pattern))
+    if cache is not None:
+        candidates = cache.config_files
+    else:
+        _, candidates, _ = _walk_project(project_path)
 
     for cfg in candidates:
         try:
-            content = cfg.read_text(encoding="utf-8")
+            content = cfg.read_bytes()
         except OSError as exc:
             logger.warning("Could not read %s: %s", cfg, exc)
             continue
 
-        if any(marker in content for marker in _DEPRECATED_MARKERS):
+        if _DEPRECATED_MARKER_RE.search(content):
             results.append(cfg)
             logger.debug("Found config needing migration: %s", cfg)
 
@@ -69,12 +79,34 @@ def find_config_files(project_path: Path) -> list[Path]:
     return results
 
 
-def _build_prompt(content: str, is_yaml: bool) -> str:
+def _is_yaml_config(name: str) -> bool:
+    """Whether a config file name is YAML (otherwise it is .properties)."""
+    return name.endswith((".yml", ".yaml"))
+
+
+def build_config_prompt(content: str, is_yaml: bool) -> list[dict]:
     """Build the Claude prompt for a config file."""
     file_type = "YAML" if is_yaml else "properties"
-    return (_CONFIG_PROMPT_TEMPLATE
-            .replace("{original_content}", content)
-            .replace("{file_type}", file_type))
+    return _cached_prompt(
+        _CONFIG_STATIC,
+        (_CONFIG_FILE_SECTION
+         .replace("{original_content}", content)
+         .replace("{file_type}", file_type)),
+    )
+
+
+def process_config_response(text: str) -> tuple[bool, str]:
+    """Post-process Claude's answer to a config prompt."""
+    migrated = text.strip()
+    # Strip markdown fences if present
+    if migrated.startswith("```"):
+        lines = migrated.split("\n")
+        # Remove first and last fence lines
+        lines = lines[1:]
+        if lines and lines[-1].strip() == "```":
+            lines = lines[:-1]
+        migrated = "\n".join(lines)
+    return True, migrated
 
 
 def migrate_config_file(file_path: Path) -> tuple[bool, str, int]:
@@ -84,7 +116,6 @@ def migrate_config_file(file_path: Path) -> tuple[bool, str, int]:
     Returns:
         (success, migrated_content_or_error, tokens_used)
     """
-    file_path = file_path.resolve()
     try:
         original_content = file_path.read_text(encoding="utf-8")
     except OSError as exc:
@@ -92,34 +123,67 @@ def migrate_config_file(file_path: Path) -> tuple[bool, str, int]:
         logger.error(msg)
         return False, msg, 0
 
-    is_yaml = file_path.suffix in (".yml", ".yaml")
-    prompt = _build_prompt(original_content, is_yaml)
-    client = _get_client()
+    return migrate_config_file_text(file_path.name, original_content)
+
+
+def migrate_config_file_text(name: str, original_content: str) -> tuple[bool, str, int]:
+    """migrate_config_file() for content already in memory; name gives the format."""
+    logger.info("Calling Claude to migrate config: %s", name)
+    ok, text, tokens_total = _call_claude(
+        build_config_prompt(original_content, _is_yaml_config(name))
+    )
+    if not ok:
+        return False, text, tokens_total
+
+    ok, migrated = process_config_response(text)
+    return ok, migrated, tokens_total
 
-    logger.info("Calling Claude to migrate config: %s", file_path.name)
+
+async def migrate_config_file_async(file_path: Path) -> tuple[bool, str, int]:
+    """Async variant of migrate_config_file()."""
     try:
-        response = client.messages.create(
-            model=CLAUDE_MODEL,
-            max_tokens=4000,
-            temperature=0.0,
-            messages=[{"role": "user", "content": prompt}],
-        )
-    except Exception as exc:
-        msg = f"Claude API error: {exc}"
+        original_content = file_path.read_text(encoding="utf-8")
+    except OSError as exc:
+        msg = f"Could not read {file_path}: {exc}"
         logger.error(msg)
         return False, msg, 0
 
-    tokens_total = response.usage.input_tokens + response.usage.output_tokens
-    logger.info("Claude config migration: %d tokens", tokens_total)
+    return await migrate_config_file_text_async(file_path.name, original_content)
+
+
+async def migrate_config_file_text_async(
+    name: str, original_content: str
+) -> tuple[bool, str, int]:
+    """Async variant of migrate_config_file_text()."""
+    logger.info("Calling Claude to migrate config: %s", name)
+    ok, text, tokens_total = await _call_claude_async(
+        build_config_prompt(original_content, _is_yaml_config(name))
+    )
+    if not ok:
+        return False, text, tokens_total
+
+    ok, migrated = process_config_response(text)
+    return ok, migrated, tokens_total
 
-    migrated = response.content[0].text.strip()
-    # Strip markdown fences if present
-    if migrated.startswith("```"):
-        lines = migrated.split("\n")
-        # Remove first and last fence lines
-        lines = lines[1:]
-        if lines and lines[-1].strip() == "```":
-            lines = lines[:-1]
-        migrated = "\n".join(lines)
 
-    return True, migrated, tokens_total
+async def migrate_config_batch(
+    file_paths: list[Path],
+    batch_size: int = 6,
+    semaphore: asyncio.Semaphore | None = None,
+) -> list[tuple[bool, str, int]]:
+    """
+    Migrate config files several per Claude call, retrying failures singly.
+
+    `semaphore` is passed through to _migrate_files_batched.
+
+    Returns:
+        One (success, migrated_content_or_error, tokens_used) per input path.
+    """
+    return await _migrate_files_batched(
+        file_paths,
+        batch_size,
+        _CONFIG_STATIC,
+        process_config_response,
+        migrate_config_file_async,
+        semaphore,
+    )
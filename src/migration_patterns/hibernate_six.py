@@ -3,60 +3,43 @@ Hibernate 6 migration: @Type/@TypeDef annotations, dialect renames.
 Spring Boot 2.x (Hibernate 5) → Spring Boot 3.x (Hibernate 6).
 """
 
+import asyncio
 import logging
+import re
 from pathlib import Path
+from typing import Callable
 
-from tree_sitter import Language, Parser, Query, QueryCursor
+from tree_sitter import Language, Query, QueryCursor, Tree
 import tree_sitter_java
 
 from src.claude_fixer import (
-    _get_client,
-    _extract_code_from_response,
+    _cached_prompt,
+    _call_claude,
+    _call_claude_async,
     _load_prompt,
-    _validate_java_syntax,
-    write_migrated_file,
+    _migrate_files_batched,
+    _process_java_response,
+    _split_template,
 )
-from src.config import CLAUDE_MODEL
+from src.parse_cache import ParseCache
 
 logger = logging.getLogger(__name__)
 
 # --- tree-sitter setup ---
 
 _JAVA_LANGUAGE = Language(tree_sitter_java.language())
-_parser = Parser(_JAVA_LANGUAGE)
 
-# Detect @Type(type = "...") annotations
-_TYPE_ANNOTATION_QUERY = Query(
+# Detect @Type(type = "...") / @TypeDef / @TypeDefs annotations in one pass
+_HIBERNATE_ANNOTATION_QUERY = Query(
     _JAVA_LANGUAGE,
     """
     (annotation
       name: (identifier) @ann_name
-      (#eq? @ann_name "Type")
-      arguments: (annotation_argument_list) @args
-    ) @annotation
-    """,
-)
-
-# Detect @TypeDef / @TypeDefs annotations
-_TYPEDEF_ANNOTATION_QUERY = Query(
-    _JAVA_LANGUAGE,
-    """
-    (annotation
-      name: (identifier) @ann_name
-      (#eq? @ann_name "TypeDef")
-    ) @annotation
-    """,
-)
-
-_TYPEDEFS_ANNOTATION_QUERY = Query(
-    _JAVA_LANGUAGE,
-    """
-    (annotation
-      name: (identifier) @ann_name
-      (#eq? @ann_name "TypeDefs")
+      (#match? @ann_name "^(Type|TypeDef|TypeDefs)$")
     ) @annotation
     """,
 )
+_HIBERNATE_ANNOTATION_CURSOR = QueryCursor(_HIBERNATE_ANNOTATION_QUERY)
 
 # Deprecated Hibernate 5 dialect class names
 _DEPRECATED_DIALECTS = [
@@ -69,59 +52,58 @@ _DEPRECATED_DIALECTS = [
     "Oracle12cDialect",
     "SQLServer2012Dialect",
 ]
+_DEPRECATED_DIALECT_RE = re.compile(
+    "|".join(map(re.escape, _DEPRECATED_DIALECTS)).encode("ascii")
+)
+
+# Byte-level pre-filter for the annotation query: "@", optional whitespace,
+# then "Type" (also the prefix of TypeDef/TypeDefs) or the start of a comment.
+# Comments are only over-approximated, keeping the match linear; the query
+# makes the final call
+_TYPE_ANNOTATION_RE = re.compile(rb"@\s*(?:Type|/[/*])")
 
 _HIBERNATE_PROMPT_TEMPLATE = _load_prompt("hibernate_six.txt")
+_HIBERNATE_STATIC, _HIBERNATE_FILE_SECTION = _split_template(_HIBERNATE_PROMPT_TEMPLATE)
 
 
-def find_hibernate_patterns(project_path: Path) -> list[Path]:
+def _has_hibernate_pattern(source: bytes, get_tree: Callable[[], Tree]) -> bool:
+    """
+    Check a Java file for a deprecated dialect or @Type/@TypeDef/@TypeDefs.
+
+    Checks run cheapest first: the dialect scan and the @Type pre-filter work
+    on raw bytes, so most files are decided without being parsed.
+    """
+    # Check for deprecated dialect references in source bytes
+    if _DEPRECATED_DIALECT_RE.search(source):
+        return True
+
+    # No "@ Type" or "@" before a comment means no @Type/@TypeDef/@TypeDefs match
+    if not _TYPE_ANNOTATION_RE.search(source):
+        return False
+
+    # Check for @Type / @TypeDef / @TypeDefs annotations
+    captures = _HIBERNATE_ANNOTATION_CURSOR.captures(get_tree().root_node)
+    if captures.get("ann_name"):
+        logger.debug("Found @%s annotation", captures["ann_name"][0].text.decode("utf-8"))
+        return True
+    return False
+
+
+def find_hibernate_patterns(project_path: Path, cache: ParseCache | None = None) -> list[Path]:
     """
     Find Java files with Hibernate 5 patterns needing migration:
     - @Type(type = "...") annotations
     - @TypeDef / @TypeDefs annotations
     - Deprecated dialect references
+
+    A shared ParseCache may be passed to reuse trees parsed by other scanners.
     """
-    project_path = project_path.resolve()
-    results: list[Path] = []
-
-    for java_file in project_path.rglob("*.java"):
-        try:
-            source = java_file.read_bytes()
-        except OSError as exc:
-            logger.warning("Could not read %s: %s", java_file, exc)
-            continue
-
-        tree = _parser.parse(source)
-        root = tree.root_node
-
-        # Check for @Type annotations
-        cursor = QueryCursor(_TYPE_ANNOTATION_QUERY)
-        captures = cursor.captures(root)
-        if captures.get("annotation"):
-            results.append(java_file)
-            logger.debug("Found @Type annotation: %s", java_file)
-            continue
-
-        # Check for @TypeDef
-        cursor = QueryCursor(_TYPEDEF_ANNOTATION_QUERY)
-        captures = cursor.captures(root)
-        if captures.get("annotation"):
-            results.append(java_file)
-            logger.debug("Found @TypeDef annotation: %s", java_file)
-            continue
-
-        # Check for @TypeDefs
-        cursor = QueryCursor(_TYPEDEFS_ANNOTATION_QUERY)
-        captures = cursor.captures(root)
-        if captures.get("annotation"):
-            results.append(java_file)
-            logger.debug("Found @TypeDefs annotation: %s", java_file)
-            continue
-
-        # Check for deprecated dialect references in source text
-        source_text = source.decode("utf-8", errors="replace")
-        if any(dialect in source_text for dialect in _DEPRECATED_DIALECTS):
-            results.append(java_file)
-            logger.debug("Found deprecated dialect: %s", java_file)
+    if cache is None:
+        cache = ParseCache()
+        cache.populate(project_path)
+    results = cache.scan("hibernate", _has_hibernate_pattern)
+    for java_file in results:
+        logger.debug("Found Hibernate 5 pattern: %s", java_file)
 
     logger.info(
         "Found %d file(s) with Hibernate 5 patterns in %s",
@@ -131,6 +113,19 @@ def find_hibernate_patterns(project_path: Path) -> list[Path]:
     return results
 
 
+def build_hibernate_prompt(original_code: str) -> list[dict]:
+    """Build the Claude prompt for a Hibernate 5 entity/config file."""
+    return _cached_prompt(
+        _HIBERNATE_STATIC,
+        _HIBERNATE_FILE_SECTION.replace("{original_code}", original_code),
+    )
+
+
+def process_hibernate_response(text: str) -> tuple[bool, str]:
+    """Post-process Claude's answer to a Hibernate prompt."""
+    return _process_java_response(text)
+
+
 def migrate_hibernate_file(file_path: Path) -> tuple[bool, str, int]:
     """
     Use Claude to migrate Hibernate 5 patterns to Hibernate 6.
@@ -138,7 +133,6 @@ def migrate_hibernate_file(file_path: Path) -> tuple[bool, str, int]:
     Returns:
         (success, migrated_code_or_error, tokens_used)
     """
-    file_path = file_path.resolve()
     try:
         original_code = file_path.read_text(encoding="utf-8")
     except OSError as exc:
@@ -146,31 +140,63 @@ def migrate_hibernate_file(file_path: Path) -> tuple[bool, str, int]:
         logger.error(msg)
         return False, msg, 0
 
-    prompt = _HIBERNATE_PROMPT_TEMPLATE.replace("{original_code}", original_code)
-    client = _get_client()
+    return migrate_hibernate_file_text(file_path.name, original_code)
+
+
+def migrate_hibernate_file_text(name: str, original_code: str) -> tuple[bool, str, int]:
+    """migrate_hibernate_file() for source already in memory; name is for logging."""
+    logger.info("Calling Claude to migrate Hibernate patterns: %s", name)
+    ok, text, tokens_total = _call_claude(build_hibernate_prompt(original_code))
+    if not ok:
+        return False, text, tokens_total
 
-    logger.info("Calling Claude to migrate Hibernate patterns: %s", file_path.name)
+    ok, migrated_code = process_hibernate_response(text)
+    return ok, migrated_code, tokens_total
+
+
+async def migrate_hibernate_file_async(file_path: Path) -> tuple[bool, str, int]:
+    """Async variant of migrate_hibernate_file()."""
     try:
-        response = client.messages.create(
-            model=CLAUDE_MODEL,
-            max_tokens=4000,
-            temperature=0.0,
-            messages=[{"role": "user", "content": prompt}],
-        )
-    except Exception as exc:
-        msg = f"Claude API error: {exc}"
+        original_code = file_path.read_text(encoding="utf-8")
+    except OSError as exc:
+        msg = f"Could not read {file_path}: {exc}"
         logger.error(msg)
         return False, msg, 0
 
-    tokens_total = response.usage.input_tokens + response.usage.output_tokens
-    logger.info("Claude Hibernate migration: %d tokens", tokens_total)
+    return await migrate_hibernate_file_text_async(file_path.name, original_code)
 
-    migrated_code = _extract_code_from_response(response.content[0].text)
 
-    if not _validate_java_syntax(migrated_code):
-        msg = "Claude-generated code has Java syntax errors"
-        logger.error(msg)
-        logger.debug("Generated code:\n%s", migrated_code)
-        return False, msg, tokens_total
+async def migrate_hibernate_file_text_async(
+    name: str, original_code: str
+) -> tuple[bool, str, int]:
+    """Async variant of migrate_hibernate_file_text()."""
+    logger.info("Calling Claude to migrate Hibernate patterns: %s", name)
+    ok, text, tokens_total = await _call_claude_async(build_hibernate_prompt(original_code))
+    if not ok:
+        return False, text, tokens_total
 
-    return True, migrated_code, tokens_total
+    ok, migrated_code = process_hibernate_response(text)
+    return ok, migrated_code, tokens_total
+
+
+async def migrate_hibernate_batch(
+    file_paths: list[Path],
+    batch_size: int = 6,
+    semaphore: asyncio.Semaphore | None = None,
+) -> list[tuple[bool, str, int]]:
+    """
+    Migrate Hibernate files several per Claude call, retrying failures singly.
+
+    `semaphore` is passed through to _migrate_files_batched.
+
+    Returns:
+        One (success, migrated_code_or_error, tokens_used) per input path.
+    """
+    return await _migrate_files_batched(
+        file_paths,
+        batch_size,
+        _HIBERNATE_STATIC,
+        process_hibernate_response,
+        migrate_hibernate_file_async,
+        semaphore,
+    )
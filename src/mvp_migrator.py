@@ -4,6 +4,7 @@ Sequential pipeline: analyze -> openrewrite -> claude-fix -> validate -> report.
 """
 
 import argparse
+import asyncio
 import logging
 import sys
 import time
@@ -13,10 +14,13 @@ from pathlib import Path
 from src.config import SPRING_BOOT_3_RECIPE, TEST_PROJECT_PATH
 from src.openrewrite_runner import run_openrewrite
 from src.orchestrator import PatternOrchestrator
-from src.validators import parse_compilation_errors, validate_compilation
+from src.parse_cache import ParseCache
+from src.validators import validate_compilation
 
 logger = logging.getLogger(__name__)
-_MVN_NS = {"m": "http://maven.apache.org/POM/4.0.0"}
+_MVN_NS = "{http://maven.apache.org/POM/4.0.0}"
+_POM_NAME = (_MVN_NS + "project", _MVN_NS + "name")
+_POM_PARENT_VERSION = (_MVN_NS + "project", _MVN_NS + "parent", _MVN_NS + "version")
 
 
 def _make_result(analysis, ow_ok, ow_changes, pattern_results,
@@ -38,24 +42,44 @@ def _make_result(analysis, ow_ok, ow_changes, pattern_results,
     }
 
 
+def _read_pom_metadata(pom_path: Path) -> tuple[str | None, str | None]:
+    """
+    Stream pom.xml for the project name and parent version.
+
+    Stops as soon as both are found (they sit near the top of a pom), and
+    clears finished elements so large multi-module poms are never held in
+    memory as a full tree.
+    """
+    name = version = None
+    path: list[str] = []
+    with open(pom_path, "rb") as f:
+        for event, elem in ET.iterparse(f, events=("start", "end")):
+            if event == "start":
+                path.append(elem.tag)
+                continue
+            key = tuple(path)
+            if key == _POM_NAME and elem.text:
+                name = elem.text.strip()
+            elif key == _POM_PARENT_VERSION and elem.text:
+                version = elem.text.strip()
+            path.pop()
+            elem.clear()
+            if name and version:
+                break
+    return name, version
+
+
 def analyze_project(project_path: Path) -> dict:
     """Count files, parse pom.xml, estimate scope."""
-    project_path = project_path.resolve()
-    total = len(list(project_path.rglob("*.java")))
+    total = sum(1 for _ in project_path.rglob("*.java"))
 
     project_name, spring_boot_version = "unknown", "unknown"
     pom_path = project_path / "pom.xml"
     if pom_path.exists():
         try:
-            root = ET.parse(pom_path).getroot()
-            name_el = root.find("m:name", _MVN_NS)
-            if name_el is not None and name_el.text:
-                project_name = name_el.text.strip()
-            parent = root.find("m:parent", _MVN_NS)
-            if parent is not None:
-                ver_el = parent.find("m:version", _MVN_NS)
-                if ver_el is not None and ver_el.text:
-                    spring_boot_version = ver_el.text.strip()
+            name, version = _read_pom_metadata(pom_path)
+            project_name = name or project_name
+            spring_boot_version = version or spring_boot_version
         except ET.ParseError as exc:
             logger.warning("Failed to parse pom.xml: %s", exc)
 
@@ -71,7 +95,8 @@ def analyze_project(project_path: Path) -> dict:
     return analysis
 
 
-def run_migration_pipeline(project_path: Path, dry_run: bool = False) -> dict:
+async def run_migration_pipeline(project_path: Path, dry_run: bool = False,
+                                 batch_api: bool = False) -> dict:
     """Execute the complete migration pipeline."""
     start = time.time()
     errors: list[str] = []
@@ -86,8 +111,16 @@ def run_migration_pipeline(project_path: Path, dry_run: bool = False) -> dict:
 
     # Stage 2: OpenRewrite
     logger.info("--- Stage 2: OpenRewrite Migration ---")
-    ow_ok, _, ow_changes = run_openrewrite(
-        project_path, SPRING_BOOT_3_RECIPE, dry_run=dry_run)
+    orchestrator = PatternOrchestrator(use_batch_api=batch_api)
+    openrewrite = asyncio.to_thread(
+        run_openrewrite, project_path, SPRING_BOOT_3_RECIPE, dry_run=dry_run)
+    if dry_run:
+        ow_ok, _, ow_changes = await openrewrite
+    else:
+        # Scan the pre-OpenRewrite sources while Maven runs; Stage 3 still
+        # scans the rewritten files, but only changed ones miss the cache
+        prescan = asyncio.to_thread(orchestrator.prescan, project_path)
+        (ow_ok, _, ow_changes), _ = await asyncio.gather(openrewrite, prescan)
     if not ow_ok:
         errors.append("OpenRewrite execution failed")
         logger.error("OpenRewrite failed — aborting pipeline")
@@ -100,8 +133,12 @@ def run_migration_pipeline(project_path: Path, dry_run: bool = False) -> dict:
 
     # Stage 3: Claude Pattern Migrations (security + config + hibernate)
     logger.info("--- Stage 3: Claude Pattern Migrations ---")
-    orchestrator = PatternOrchestrator()
-    pattern_results = orchestrator.run(project_path, dry_run=dry_run)
+    # One parse cache for every Java scanner, built after OpenRewrite rewrote files
+    parse_cache = ParseCache()
+    if not dry_run:
+        parse_cache.populate(project_path)
+    pattern_results = await orchestrator.run(project_path, dry_run=dry_run,
+                                             cache=parse_cache)
     # Collect any pattern errors into pipeline errors
     for pattern_name in ("security", "config", "hibernate"):
         for err in pattern_results[pattern_name]["errors"]:
@@ -113,9 +150,10 @@ def run_migration_pipeline(project_path: Path, dry_run: bool = False) -> dict:
         logger.info("Dry-run mode: skipping compilation")
         comp_ok, comp_errors = True, []
     else:
-        comp_ok, comp_output = validate_compilation(project_path)
-        comp_errors = parse_compilation_errors(comp_output) if not comp_ok else []
-        if not comp_ok:
+        comp_ok, _, comp_errors = validate_compilation(project_path)
+        if comp_ok:
+            comp_errors = []
+        else:
             errors.append(f"Compilation failed with {len(comp_errors)} error(s)")
 
     duration = time.time() - start
@@ -191,12 +229,18 @@ def main():
                         help="Preview changes without applying")
     parser.add_argument("--verbose", action="store_true",
                         help="Enable debug logging")
+    parser.add_argument("--batch-api", action="store_true",
+                        help="Submit Claude migrations as one Message Batch "
+                             "(half price, slower turnaround)")
     args = parser.parse_args()
+    # Resolve once here; everything below expects an absolute project path
+    project_path = args.project_path.resolve()
 
     if args.verbose:
         logging.getLogger().setLevel(logging.DEBUG)
 
-    results = run_migration_pipeline(args.project_path, dry_run=args.dry_run)
+    results = asyncio.run(run_migration_pipeline(
+        project_path, dry_run=args.dry_run, batch_api=args.batch_api))
     print("\n" + generate_report(results))
     sys.exit(0 if results["success"] else 1)
 
@@ -4,14 +4,16 @@ Runs OpenRewrite Maven plugin without modifying build files.
 """
 
 import logging
-import re
-import subprocess
 from pathlib import Path
+from typing import Iterable
 
 from src.config import OPENREWRITE_VERSION, REWRITE_RECIPE_COORDINATES
+from src.process_stream import stream_process
 
 logger = logging.getLogger(__name__)
 
+_TIMEOUT_SECONDS = 600  # 10 minute timeout
+
 
 def _build_maven_command(
     recipe: str,
@@ -32,32 +34,47 @@ def _build_maven_command(
     return cmd
 
 
-def _parse_change_count(output: str) -> int:
-    """Extract the number of changed files from OpenRewrite output.
+def _leading_token(text: str) -> str:
+    """Return the run of non-whitespace at the start of text ('' if none)."""
+    if not text or text[0].isspace():
+        return ""
+    return text.split(None, 1)[0]
+
+
+def _parse_change_count(lines: Iterable[str]) -> int:
+    """Extract the number of changed files from OpenRewrite output lines.
 
     Handles two output formats:
       run goal:    'Changes have been made to <path> by:'
       dryRun goal: 'These recipes would make changes to <path>:'
-    Each matching line represents one changed file.
+    Each matching line represents one changed file. Lines are consumed once,
+    so a live subprocess stream can be passed directly.
     """
-    # run goal format: "Changes have been made to <path> by:"
-    applied = re.findall(
-        r"Changes have been made to (\S+) by:", output
-    )
-    # dryRun goal format: "These recipes would make changes to <path>:"
-    planned = re.findall(
-        r"These recipes would make changes to (\S+):", output
-    )
-    total = len(applied) + len(planned)
-    if total > 0:
-        return total
-
-    # Fallback: look for summary lines like "Made N changes"
-    match = re.search(r"Made (\d+) change", output)
-    if match:
-        return int(match.group(1))
-
-    return 0
+    changed = 0
+    fallback = None
+    for line in lines:
+        # run goal format: "Changes have been made to <path> by:"
+        _, found, rest = line.partition("Changes have been made to ")
+        if found:
+            path = _leading_token(rest)
+            if path and rest[len(path):].startswith(" by:"):
+                changed += 1
+                continue
+        # dryRun goal format: "These recipes would make changes to <path>:"
+        _, found, rest = line.partition("These recipes would make changes to ")
+        if found and ":" in _leading_token(rest)[1:]:
+            changed += 1
+            continue
+        # Fallback: look for summary lines like "Made N changes"
+        if fallback is None:
+            _, found, rest = line.partition("Made ")
+            count, _, tail = rest.partition(" ")
+            if found and count.isdigit() and tail.startswith("change"):
+                fallback = int(count)
+
+    if changed > 0:
+        return changed
+    return fallback or 0
 
 
 def run_openrewrite(
@@ -75,8 +92,8 @@ def run_openrewrite(
 
     Returns:
         (success: bool, output: str, change_count: int)
+        `output` holds the last OUTPUT_TAIL_LINES lines of the Maven log.
     """
-    project_path = project_path.resolve()
     if not (project_path / "pom.xml").exists():
         msg = f"No pom.xml found at {project_path}"
         logger.error(msg)
@@ -92,28 +109,24 @@ def run_openrewrite(
     )
     logger.debug("Command: %s", " ".join(cmd))
 
+    # Count changes as lines arrive so the full log is never held in memory
     try:
-        result = subprocess.run(
-            cmd,
-            cwd=str(project_path),
-            capture_output=True,
-            text=True,
-            timeout=600,  # 10 minute timeout
+        returncode, output, timed_out, change_count = stream_process(
+            cmd, project_path, _TIMEOUT_SECONDS, _parse_change_count
         )
-    except subprocess.TimeoutExpired:
-        msg = "OpenRewrite timed out after 600 seconds"
-        logger.error(msg)
-        return False, msg, 0
     except FileNotFoundError:
         msg = "Maven (mvn) not found on PATH"
         logger.error(msg)
         return False, msg, 0
 
-    combined_output = result.stdout + "\n" + result.stderr
-    success = result.returncode == 0
+    if timed_out:
+        msg = f"OpenRewrite timed out after {_TIMEOUT_SECONDS} seconds"
+        logger.error(msg)
+        return False, msg, 0
+
+    success = returncode == 0
 
     if success:
-        change_count = _parse_change_count(combined_output)
         logger.info(
             "OpenRewrite %s completed successfully: %d change(s) detected",
             mode,
@@ -122,8 +135,8 @@ def run_openrewrite(
     else:
         change_count = 0
         logger.error(
-            "OpenRewrite %s failed (exit code %d)", mode, result.returncode
+            "OpenRewrite %s failed (exit code %d)", mode, returncode
         )
-        logger.error("Output:\n%s", combined_output[-2000:])
+        logger.error("Output:\n%s", output[-2000:])
 
-    return success, combined_output, change_count
+    return success, output, change_count
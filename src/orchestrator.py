@@ -3,22 +3,38 @@ Pattern orchestrator: coordinates all Claude migration pattern types.
 Replaces the single-pattern security migration in the pipeline.
 """
 
+import asyncio
 import logging
 from pathlib import Path
 
+from src.claude_batch import run_batch
+from src.config import MAX_MIGRATE_BYTES
 from src.claude_fixer import (
+    MAX_CONCURRENT_CALLS,
+    _atomic_write,
+    _has_security_config,
+    build_security_prompt,
     find_security_configs,
-    migrate_security_config,
+    migrate_security_batch,
+    process_security_response,
     write_migrated_file,
 )
 from src.migration_patterns.config_properties import (
+    _is_yaml_config,
+    build_config_prompt,
     find_config_files,
-    migrate_config_file,
+    migrate_config_batch,
+    process_config_response,
 )
 from src.migration_patterns.hibernate_six import (
+    _has_hibernate_pattern,
+    build_hibernate_prompt,
     find_hibernate_patterns,
-    migrate_hibernate_file,
+    migrate_hibernate_batch,
+    process_hibernate_response,
 )
+from src import parse_cache
+from src.parse_cache import ParseCache
 
 logger = logging.getLogger(__name__)
 
@@ -26,10 +42,46 @@ logger = logging.getLogger(__name__)
 class PatternOrchestrator:
     """Coordinates security, config, and Hibernate migration patterns."""
 
-    def run(self, project_path: Path, dry_run: bool = False) -> dict:
+    def __init__(self, use_batch_api: bool = False):
+        """
+        Args:
+            use_batch_api: Submit all Claude calls as one Message Batch
+                (half price, but results can take minutes to arrive).
+        """
+        self.use_batch_api = use_batch_api
+        # Java files written during the current run()
+        self._written: set[Path] = set()
+
+    def prescan(self, project_path: Path) -> None:
+        """
+        Warm the persistent scan cache for the Java scanners.
+
+        Meant to run while OpenRewrite is still rewriting the project: results
+        are keyed by file contents, so the real scan in run() afterwards only
+        re-parses the files OpenRewrite changed. Does nothing when the scan
+        cache is disabled, since the results would be thrown away.
+        """
+        if not parse_cache.is_enabled():
+            return
+        try:
+            cache = ParseCache()
+            cache.populate(project_path)
+            cache.scan("security", _has_security_config)
+            cache.scan("hibernate", _has_hibernate_pattern)
+        except Exception as exc:
+            # Only an optimization; run() scans again regardless
+            logger.warning("Pre-scan failed: %s", exc)
+            return
+        logger.debug("Pre-scanned %s while OpenRewrite runs", project_path)
+
+    async def run(self, project_path: Path, dry_run: bool = False,
+                  cache: ParseCache | None = None) -> dict:
         """
         Run all migration patterns on the project.
 
+        All three scanners share `cache` (built here if omitted): one walk of
+        the project, with each Java file read and parsed at most once.
+
         Returns a results dict with per-pattern breakdown:
         {
             "security": {"found": N, "migrated": N, "tokens": N, "errors": [...]},
@@ -38,94 +90,185 @@ class PatternOrchestrator:
             "totals": {"found": N, "migrated": N, "tokens": N},
         }
         """
-        project_path = project_path.resolve()
-        results = {}
+        results = {
+            p: {"found": 0, "migrated": 0, "tokens": 0, "errors": []}
+            for p in ("security", "config", "hibernate")
+        }
 
         if dry_run:
             logger.info("Dry-run mode: skipping Claude pattern migrations")
-            for pattern in ("security", "config", "hibernate"):
-                results[pattern] = {"found": 0, "migrated": 0, "tokens": 0, "errors": []}
             results["totals"] = {"found": 0, "migrated": 0, "tokens": 0}
             return results
 
-        # Security
-        results["security"] = self._run_security(project_path)
+        if cache is None:
+            cache = ParseCache()
+            cache.populate(project_path)
+
+        files = self._find_all(project_path, cache, results)
+        # The Security and Hibernate scanners can match the same file (e.g. a
+        # config class that also names a dialect). Hibernate migrates those
+        # only after Security has written its version, starting from that text
+        security_files = set(files["security"])
+        shared = [f for f in files["hibernate"] if f in security_files]
+        files["hibernate"] = [f for f in files["hibernate"] if f not in security_files]
+        if shared:
+            logger.info("%d file(s) match both Security and Hibernate", len(shared))
+        self._written = set()
 
-        # Config properties
-        results["config"] = self._run_config(project_path)
+        if self.use_batch_api:
+            # Batch polling blocks, so keep it off the event loop
+            await asyncio.to_thread(self._run_batch_api, files, shared, results)
+        else:
+            # Apart from `shared`, the patterns touch disjoint files, so their
+            # Claude calls can overlap; one semaphore caps requests in flight
+            # across all three
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_CALLS)
 
-        # Hibernate
-        results["hibernate"] = self._run_hibernate(project_path)
+            async def security_then_shared() -> None:
+                await self._migrate("security", files["security"], results, semaphore)
+                await self._migrate("hibernate", shared, results, semaphore)
+
+            await asyncio.gather(
+                security_then_shared(),
+                self._migrate("config", files["config"], results, semaphore),
+                self._migrate("hibernate", files["hibernate"], results, semaphore),
+            )
 
         # Totals
+        s, c, h = results["security"], results["config"], results["hibernate"]
         results["totals"] = {
-            "found": sum(results[p]["found"] for p in ("security", "config", "hibernate")),
-            "migrated": sum(results[p]["migrated"] for p in ("security", "config", "hibernate")),
-            "tokens": sum(results[p]["tokens"] for p in ("security", "config", "hibernate")),
+            "found": s["found"] + c["found"] + h["found"],
+            "migrated": s["migrated"] + c["migrated"] + h["migrated"],
+            "tokens": s["tokens"] + c["tokens"] + h["tokens"],
         }
 
         return results
 
-    def _run_security(self, project_path: Path) -> dict:
-        """Run security config migration pattern."""
-        result = {"found": 0, "migrated": 0, "tokens": 0, "errors": []}
-        try:
-            files = find_security_configs(project_path)
-            result["found"] = len(files)
-            for f in files:
-                ok, content, tokens = migrate_security_config(f)
-                result["tokens"] += tokens
-                if ok and write_migrated_file(f, content):
-                    result["migrated"] += 1
-                elif ok:
-                    result["errors"].append(f"Failed to write: {f.name}")
-                else:
-                    result["errors"].append(f"Migration failed for {f.name}: {content}")
-        except Exception as exc:
-            logger.error("Security pattern failed: %s", exc)
-            result["errors"].append(f"Security pattern error: {exc}")
-        return result
+    def _find_all(
+        self, project_path: Path, cache: ParseCache, results: dict
+    ) -> dict[str, list[Path]]:
+        """
+        Run the three scanners on `cache`, recording counts and errors in results.
 
-    def _run_config(self, project_path: Path) -> dict:
-        """Run config properties migration pattern."""
-        result = {"found": 0, "migrated": 0, "tokens": 0, "errors": []}
-        try:
-            files = find_config_files(project_path)
-            result["found"] = len(files)
-            for f in files:
-                ok, content, tokens = migrate_config_file(f)
-                result["tokens"] += tokens
-                if ok:
-                    # Write the migrated content back
-                    try:
-                        f.write_text(content, encoding="utf-8")
-                        result["migrated"] += 1
-                        logger.info("Wrote migrated config: %s", f.name)
-                    except OSError as exc:
-                        result["errors"].append(f"Failed to write {f.name}: {exc}")
-                else:
-                    result["errors"].append(f"Migration failed for {f.name}: {content}")
-        except Exception as exc:
-            logger.error("Config pattern failed: %s", exc)
-            result["errors"].append(f"Config pattern error: {exc}")
-        return result
+        Files over MAX_MIGRATE_BYTES count as found but are reported as errors
+        and left out of the returned lists, since their migration would not
+        fit in one response.
+        """
+        finders = (
+            ("security", find_security_configs),
+            ("config", find_config_files),
+            ("hibernate", find_hibernate_patterns),
+        )
+        files: dict[str, list[Path]] = {}
+        for pattern, finder in finders:
+            try:
+                files[pattern] = finder(project_path, cache)
+            except Exception as exc:
+                logger.error("%s pattern failed: %s", pattern.capitalize(), exc)
+                results[pattern]["errors"].append(f"{pattern.capitalize()} pattern error: {exc}")
+                files[pattern] = []
+            results[pattern]["found"] = len(files[pattern])
+            for f in files[pattern]:
+                if f in cache.oversized:
+                    results[pattern]["errors"].append(
+                        f"{f.name} is too large to migrate (over {MAX_MIGRATE_BYTES} "
+                        "bytes), needs manual review"
+                    )
+            files[pattern] = [f for f in files[pattern] if f not in cache.oversized]
+        return files
+
+    def _write(self, pattern: str, f: Path, ok: bool, content: str) -> str | None:
+        """Write one file's migration back to disk; return an error message on failure."""
+        if not ok:
+            return f"Migration failed for {f.name}: {content}"
+        if pattern == "config":
+            # Config files are rewritten in place without a .bak, which could
+            # otherwise be packaged from src/main/resources
+            try:
+                _atomic_write(f, content)
+            except OSError as exc:
+                return f"Failed to write {f.name}: {exc}"
+            logger.info("Wrote migrated config: %s", f.name)
+            return None
+        # A file written earlier this run already has the original in its .bak
+        if not write_migrated_file(f, content, backup=f not in self._written):
+            return f"Failed to write: {f.name}"
+        self._written.add(f)
+        return None
+
+    @staticmethod
+    def _tally(result: dict, outcomes: list[tuple[int, str | None]]) -> None:
+        """Fold per-file (tokens, error or None) outcomes into a pattern result."""
+        for tokens, err in outcomes:
+            result["tokens"] += tokens
+            if err is None:
+                result["migrated"] += 1
+            else:
+                result["errors"].append(err)
+
+    def _run_batch_api(self, files: dict[str, list[Path]], shared: list[Path],
+                       results: dict) -> None:
+        """
+        Run all three patterns through Message Batches.
+
+        Files in `shared` get their Hibernate migration from a second batch,
+        built from the text the first batch's Security migration wrote.
+        """
+        self._submit_batch(files, results)
+        if shared:
+            self._submit_batch({"hibernate": shared}, results)
+
+    def _submit_batch(self, files: dict[str, list[Path]], results: dict) -> None:
+        """Migrate `files` (pattern -> paths) through a single Message Batch."""
+        builders = {
+            "security": lambda f, text: build_security_prompt(text),
+            "config": lambda f, text: build_config_prompt(text, _is_yaml_config(f.name)),
+            "hibernate": lambda f, text: build_hibernate_prompt(text),
+        }
+        processors = {
+            "security": process_security_response,
+            "config": process_config_response,
+            "hibernate": process_hibernate_response,
+        }
+
+        # custom_id -> (pattern, file); IDs must be short and path-free
+        jobs: dict[str, tuple[str, Path]] = {}
+        prompts: dict[str, list[dict]] = {}
+        for pattern, pattern_files in files.items():
+            for i, f in enumerate(pattern_files):
+                try:
+                    original = f.read_text(encoding="utf-8")
+                except OSError as exc:
+                    results[pattern]["errors"].append(f"Could not read {f.name}: {exc}")
+                    continue
+                custom_id = f"{pattern}-{i}"
+                jobs[custom_id] = (pattern, f)
+                prompts[custom_id] = builders[pattern](f, original)
+
+        responses = run_batch(prompts)
+        for custom_id, (pattern, f) in jobs.items():
+            ok, content, tokens = responses[custom_id]
+            if ok:
+                ok, content = processors[pattern](content)
+            self._tally(results[pattern], [(tokens, self._write(pattern, f, ok, content))])
 
-    def _run_hibernate(self, project_path: Path) -> dict:
-        """Run Hibernate 6 migration pattern."""
-        result = {"found": 0, "migrated": 0, "tokens": 0, "errors": []}
+    async def _migrate(self, pattern: str, files: list[Path], results: dict,
+                       semaphore: asyncio.Semaphore) -> None:
+        """Migrate one pattern's files several per Claude call and write them back."""
+        if not files:
+            return
+        migrate_batch = {
+            "security": migrate_security_batch,
+            "config": migrate_config_batch,
+            "hibernate": migrate_hibernate_batch,
+        }[pattern]
+        result = results[pattern]
         try:
-            files = find_hibernate_patterns(project_path)
-            result["found"] = len(files)
-            for f in files:
-                ok, content, tokens = migrate_hibernate_file(f)
-                result["tokens"] += tokens
-                if ok and write_migrated_file(f, content):
-                    result["migrated"] += 1
-                elif ok:
-                    result["errors"].append(f"Failed to write: {f.name}")
-                else:
-                    result["errors"].append(f"Migration failed for {f.name}: {content}")
+            migrations = await migrate_batch(files, semaphore=semaphore)
+            self._tally(result, [
+                (tokens, self._write(pattern, f, ok, content))
+                for f, (ok, content, tokens) in zip(files, migrations)
+            ])
         except Exception as exc:
-            logger.error("Hibernate pattern failed: %s", exc)
-            result["errors"].append(f"Hibernate pattern error: {exc}")
-        return result
+            logger.error("%s pattern failed: %s", pattern.capitalize(), exc)
+            result["errors"].append(f"{pattern.capitalize()} pattern error: {exc}")
@@ -0,0 +1,303 @@
+"""
+Parse caching for the pattern scanners.
+- ParseCache: one project walk; in-memory Java sources and trees shared by
+  all scanners in one run, plus the application config file paths
+- Persistent scan results keyed by SHA-256 of file contents (SQLite)
+"""
+
+import hashlib
+import importlib.metadata
+import logging
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Callable, Iterator
+
+from tree_sitter import Language, Parser, Tree
+import tree_sitter_java
+
+from src.config import MAX_MIGRATE_BYTES, SCAN_CACHE_PATH
+
+logger = logging.getLogger(__name__)
+
+# Bump when a scanner's detection logic changes so stale results are dropped
+_CACHE_VERSION = 2
+_GRAMMAR_VERSION = (
+    f"{importlib.metadata.version('tree-sitter-java')}/{_CACHE_VERSION}"
+)
+
+_JAVA_LANGUAGE = Language(tree_sitter_java.language())
+_parser = Parser(_JAVA_LANGUAGE)
+
+# File reads release the GIL, so a thread pool overlaps their I/O latency
+_READ_WORKERS = 16
+
+_conn: sqlite3.Connection | None = None
+_disabled = not SCAN_CACHE_PATH
+_lock = threading.Lock()
+
+
+def _get_conn() -> sqlite3.Connection | None:
+    """Open the cache database, clearing it if the grammar version changed."""
+    global _conn, _disabled
+    if _conn is not None or _disabled:
+        return _conn
+
+    try:
+        path = Path(SCAN_CACHE_PATH).expanduser()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "hash TEXT, kind TEXT, result INTEGER, PRIMARY KEY (hash, kind))"
+        )
+        row = conn.execute(
+            "SELECT value FROM meta WHERE key = 'grammar-version'"
+        ).fetchone()
+        if row is None or row[0] != _GRAMMAR_VERSION:
+            logger.info("Scan cache grammar version changed; clearing %s", path)
+            conn.execute("DELETE FROM cache")
+            conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('grammar-version', ?)",
+                (_GRAMMAR_VERSION,),
+            )
+            conn.commit()
+    except (OSError, sqlite3.Error) as exc:
+        logger.warning("Scan cache unavailable, scanning without it: %s", exc)
+        _disabled = True
+        return None
+
+    _conn = conn
+    return _conn
+
+
+def is_enabled() -> bool:
+    """Whether scan results persist across runs (SCAN_CACHE_PATH set and usable)."""
+    with _lock:
+        return _get_conn() is not None
+
+
+def _lookup(digest: str, kind: str) -> bool | None:
+    """Return the stored scanner result for a content hash, or None on a miss."""
+    with _lock:
+        conn = _get_conn()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute(
+                "SELECT result FROM cache WHERE hash = ? AND kind = ?",
+                (digest, kind),
+            ).fetchone()
+        except sqlite3.Error as exc:
+            logger.warning("Scan cache lookup failed: %s", exc)
+            return None
+    return None if row is None else bool(row[0])
+
+
+def _store(digest: str, kind: str, result: bool) -> None:
+    """Record a scanner result for a content hash (committed by flush())."""
+    with _lock:
+        if _conn is None:
+            return
+        try:
+            _conn.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+                (digest, kind, int(result)),
+            )
+        except sqlite3.Error as exc:
+            logger.warning("Scan cache write failed: %s", exc)
+
+
+def flush() -> None:
+    """Commit results recorded since the last flush (call once per scan)."""
+    with _lock:
+        if _conn is None:
+            return
+        try:
+            _conn.commit()
+        except sqlite3.Error as exc:
+            logger.warning("Scan cache commit failed: %s", exc)
+
+
+# Config file names the walk indexes: application.{properties,yml,yaml} and
+# application-*.{properties,yml,yaml}
+_CONFIG_SUFFIXES = (".properties", ".yml", ".yaml")
+
+
+def _is_config_file_name(name: str) -> bool:
+    """Check a file name against the application[-*] config patterns."""
+    stem, dot, ext = name.rpartition(".")
+    return (
+        bool(dot)
+        and f".{ext}" in _CONFIG_SUFFIXES
+        and (stem == "application" or stem.startswith("application-"))
+    )
+
+
+# Smaller files cannot hold anything worth migrating
+_MIN_FILE_BYTES = 16
+
+
+def _iter_files(root: Path) -> Iterator[os.DirEntry]:
+    """Yield the file entries under root in os.walk order, without following directory symlinks."""
+    dirs = [os.fspath(root)]
+    while dirs:
+        subdirs: list[str] = []
+        try:
+            with os.scandir(dirs.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    else:
+                        yield entry
+        except OSError as exc:
+            logger.warning("Could not list %s: %s", exc.filename, exc)
+        dirs.extend(reversed(subdirs))
+
+
+def _walk_project(project_path: Path) -> tuple[list[Path], list[Path], set[Path]]:
+    """
+    Classify a project's files into Java sources and config files in one walk.
+
+    Files under _MIN_FILE_BYTES are left out before they are opened, using the
+    size from the directory entry's stat. Files over MAX_MIGRATE_BYTES are
+    kept, so scanners still find them, but are also returned in the third
+    set: their migration would not fit in one response.
+
+    Returns:
+        (java_files, config_files, oversized)
+    """
+    java_files: list[Path] = []
+    config_files: list[Path] = []
+    oversized: set[Path] = set()
+    skipped = 0
+    for entry in _iter_files(project_path):
+        if entry.name.endswith(".java"):
+            bucket = java_files
+        elif _is_config_file_name(entry.name):
+            bucket = config_files
+        else:
+            continue
+        try:
+            size = entry.stat().st_size
+        except OSError as exc:
+            logger.warning("Could not stat %s: %s", entry.path, exc)
+            continue
+        if size < _MIN_FILE_BYTES:
+            skipped += 1
+            continue
+        path = Path(entry.path)
+        if size > MAX_MIGRATE_BYTES:
+            logger.debug("%s is too large to migrate (%d bytes)", path, size)
+            oversized.add(path)
+        bucket.append(path)
+    if skipped:
+        logger.debug("Skipped %d file(s) under %d bytes", skipped, _MIN_FILE_BYTES)
+    if oversized:
+        logger.info(
+            "%d file(s) over %d bytes will be scanned but not migrated",
+            len(oversized),
+            MAX_MIGRATE_BYTES,
+        )
+    return java_files, config_files, oversized
+
+
+def _read_source(path: Path) -> bytes | None:
+    """Read a file's bytes, logging and returning None if it is unreadable."""
+    try:
+        return path.read_bytes()
+    except OSError as exc:
+        logger.warning("Could not read %s: %s", path, exc)
+        return None
+
+
+# Detectors receive the source and a zero-argument callable returning its tree,
+# so cheap byte-level checks can rule a file out before anything is parsed
+Detector = Callable[[bytes, Callable[[], Tree]], bool]
+
+
+class ParseCache:
+    """Java sources, tree-sitter trees and config files for one project, shared across scanners."""
+
+    def __init__(self):
+        self.config_files: list[Path] = []
+        # Java/config files too large to migrate (over MAX_MIGRATE_BYTES)
+        self.oversized: set[Path] = set()
+        self._sources: dict[Path, bytes] = {}
+        self._trees: dict[Path, Tree] = {}
+
+    def populate(self, project_path: Path) -> None:
+        """
+        Walk project_path once, reading every .java file concurrently (trees
+        are parsed on demand) and recording application config file paths.
+
+        Calling it again starts over: sources and trees from the previous
+        walk are dropped, so edited or deleted files are not reused.
+        """
+        self._sources.clear()
+        self._trees.clear()
+        java_files, self.config_files, self.oversized = _walk_project(project_path)
+        with ThreadPoolExecutor(max_workers=_READ_WORKERS) as pool:
+            for java_file, source in zip(java_files, pool.map(_read_source, java_files)):
+                if source is not None:
+                    self._sources[java_file] = source
+        logger.debug(
+            "Parse cache loaded %d Java file(s), %d config file(s)",
+            len(self._sources),
+            len(self.config_files),
+        )
+
+    def tree(self, path: Path) -> Tree:
+        """Return a cached file's tree, parsing it the first time it is needed."""
+        tree = self._trees.get(path)
+        if tree is None:
+            tree = self._trees[path] = _parser.parse(self._sources[path])
+        return tree
+
+    def scan(self, kind: str, detect_fn: Detector) -> list[Path]:
+        """
+        Return the cached files for which detect_fn(source, get_tree) is true.
+
+        Results come from the persistent cache when the file's contents were
+        seen before. Remaining files are checked here, sharing parsed trees
+        with other scanners.
+
+        Args:
+            kind: Scanner name used in the persistent cache key
+            detect_fn: Detector taking (source bytes, get_tree)
+        """
+        # Without the persistent cache the digests would never be used
+        persistent = is_enabled()
+        matched: dict[Path, bool] = {}
+        pending: list[tuple[Path, str | None]] = []
+        for path, source in self._sources.items():
+            if not persistent:
+                pending.append((path, None))
+                continue
+            digest = hashlib.sha256(source).hexdigest()
+            cached = _lookup(digest, kind)
+            if cached is None:
+                pending.append((path, digest))
+            else:
+                matched[path] = cached
+
+        found = [
+            detect_fn(self._sources[path], partial(self.tree, path))
+            for path, _ in pending
+        ]
+
+        for (path, digest), is_match in zip(pending, found):
+            if digest is not None:
+                _store(digest, kind, is_match)
+            matched[path] = is_match
+        if persistent:
+            flush()
+
+        return [path for path in self._sources if matched[path]]
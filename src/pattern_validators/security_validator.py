@@ -4,6 +4,42 @@ Checks that migrated code uses Boot 3.x patterns and preserves all security rule
 """
 
 import re
+from collections import Counter
+
+# Security features that must survive the migration
+_FEATURES = ("formLogin", "logout", "csrf", "cors", "httpBasic")
+
+# Fixed strings the checks look for. One alternation counts all of them in a
+# single pass per string instead of one full substring scan per check; none
+# of them can overlap another, so the counts match str.count/`in` tests.
+_TOKENS = (
+    "extends WebSecurityConfigurerAdapter",
+    "antMatchers",
+    "authorizeRequests()",
+    "authorizeHttpRequests",
+    "EnableGlobalMethodSecurity",
+    "@Bean",
+    "SecurityFilterChain",
+    "return http.build()",
+    ".and()",
+) + _FEATURES
+_TOKEN_RE = re.compile("|".join(map(re.escape, _TOKENS)))
+
+# URL literals and hasRole() arguments, fused so each string is scanned once
+_URL_OR_ROLE_RE = re.compile(r'"(?P<url>/[^"]*)"|hasRole\("(?P<role>[^"]+)"\)')
+
+
+def _urls_and_roles(code: str) -> tuple[set[str], set[str]]:
+    """Collect the quoted URL patterns and hasRole() roles in one scan."""
+    urls: set[str] = set()
+    roles: set[str] = set()
+    for match in _URL_OR_ROLE_RE.finditer(code):
+        url = match.group("url")
+        if url is None:
+            roles.add(match.group("role"))
+        else:
+            urls.add(url)
+    return urls, roles
 
 
 class SecurityMigrationValidator:
@@ -17,49 +53,50 @@ class SecurityMigrationValidator:
             (is_valid, list of issues found)
         """
         issues: list[str] = []
+        found = Counter(_TOKEN_RE.findall(migrated))
+        found_original = Counter(_TOKEN_RE.findall(original))
 
         # Required removals
-        if "extends WebSecurityConfigurerAdapter" in migrated:
+        if found["extends WebSecurityConfigurerAdapter"]:
             issues.append("Still extends WebSecurityConfigurerAdapter")
 
-        if "antMatchers" in migrated:
+        if found["antMatchers"]:
             issues.append("antMatchers not converted to requestMatchers")
 
-        if "authorizeRequests()" in migrated and "authorizeHttpRequests" not in migrated:
+        if found["authorizeRequests()"] and not found["authorizeHttpRequests"]:
             issues.append("authorizeRequests not converted to authorizeHttpRequests")
 
-        if "EnableGlobalMethodSecurity" in migrated:
+        if found["EnableGlobalMethodSecurity"]:
             issues.append("EnableGlobalMethodSecurity not converted to EnableMethodSecurity")
 
         # Required additions
-        if "@Bean" not in migrated or "SecurityFilterChain" not in migrated:
+        if not found["@Bean"] or not found["SecurityFilterChain"]:
             issues.append("Missing @Bean SecurityFilterChain")
 
-        if "return http.build()" not in migrated:
+        if not found["return http.build()"]:
             issues.append("Missing return http.build()")
 
         # Lambda DSL check
-        and_count = migrated.count(".and()")
+        and_count = found[".and()"]
         if and_count > 0:
             issues.append(f"Still using .and() chaining ({and_count} occurrences)")
 
+        original_urls, original_roles = _urls_and_roles(original)
+        migrated_urls, migrated_roles = _urls_and_roles(migrated)
+
         # Preserve URL patterns from original
-        original_urls = set(re.findall(r'"(/[^"]*)"', original))
-        migrated_urls = set(re.findall(r'"(/[^"]*)"', migrated))
         lost_urls = original_urls - migrated_urls
         if lost_urls:
             issues.append(f"URL patterns lost: {lost_urls}")
 
         # Preserve role checks
-        original_roles = set(re.findall(r'hasRole\("([^"]+)"\)', original))
-        migrated_roles = set(re.findall(r'hasRole\("([^"]+)"\)', migrated))
         lost_roles = original_roles - migrated_roles
         if lost_roles:
             issues.append(f"Role checks lost: {lost_roles}")
 
         # Check key security features are preserved
-        for feature in ["formLogin", "logout", "csrf", "cors", "httpBasic"]:
-            if feature in original and feature not in migrated:
+        for feature in _FEATURES:
+            if found_original[feature] and not found[feature]:
                 issues.append(f"Security feature lost: {feature}")
 
         return len(issues) == 0, issues
@@ -0,0 +1,68 @@
+"""
+Streaming subprocess runner shared by the Maven-driven stages.
+Output is consumed line by line as it arrives; only a bounded tail is kept.
+"""
+
+import subprocess
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+# Lines of output kept for error reporting; the rest is discarded as read
+OUTPUT_TAIL_LINES = 2000
+
+
+def _tee(lines: Iterable[str], tail: deque[str]) -> Iterator[str]:
+    """Yield lines unchanged while keeping the most recent ones in tail."""
+    for line in lines:
+        tail.append(line)
+        yield line
+
+
+def stream_process(
+    cmd: list[str],
+    cwd: Path,
+    timeout: float,
+    consume_lines: Callable[[Iterable[str]], T],
+) -> tuple[int, str, bool, T]:
+    """
+    Run cmd with stdout and stderr merged, feeding its lines to consume_lines.
+
+    The process is killed if it runs longer than `timeout` seconds. Raises
+    FileNotFoundError if the executable is missing.
+
+    Returns:
+        (returncode, tail_output, timed_out, consumed)
+        `tail_output` holds the last OUTPUT_TAIL_LINES lines of output and
+        `consumed` is whatever consume_lines returned.
+    """
+    proc = subprocess.Popen(
+        cmd,
+        cwd=str(cwd),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        errors="replace",
+        bufsize=1,
+    )
+
+    timed_out = threading.Event()
+
+    def _kill() -> None:
+        timed_out.set()
+        proc.kill()
+
+    timer = threading.Timer(timeout, _kill)
+    timer.start()
+    tail: deque[str] = deque(maxlen=OUTPUT_TAIL_LINES)
+    try:
+        consumed = consume_lines(_tee(proc.stdout, tail))
+        returncode = proc.wait()
+    finally:
+        timer.cancel()
+        proc.stdout.close()
+
+    return returncode, "".join(tail), timed_out.is_set(), consumed
@@ -4,13 +4,21 @@ Validation tools for migration pipeline.
 
 import logging
 import re
-import subprocess
 from pathlib import Path
+from typing import Iterable
+
+from src.process_stream import stream_process
 
 logger = logging.getLogger(__name__)
 
+_TIMEOUT_SECONDS = 300  # 5 minute timeout
+
+_COMPILATION_ERROR_RE = re.compile(
+    r"\[ERROR\]\s+(.+\.java):\[(\d+),(\d+)\]\s+(.*)"
+)
 
-def validate_compilation(project_path: Path) -> tuple[bool, str]:
+
+def validate_compilation(project_path: Path) -> tuple[bool, str, list[dict]]:
     """
     Run mvn clean compile and check for errors.
 
@@ -18,47 +26,72 @@ def validate_compilation(project_path: Path) -> tuple[bool, str]:
         project_path: Path to Maven project root
 
     Returns:
-        (success: bool, maven_output: str)
+        (success: bool, maven_output: str, errors: list[dict])
+        `maven_output` holds the last OUTPUT_TAIL_LINES lines of the Maven
+        log; `errors` is parsed from the whole log as it streams.
     """
-    project_path = project_path.resolve()
     if not (project_path / "pom.xml").exists():
         msg = f"No pom.xml found at {project_path}"
         logger.error(msg)
-        return False, msg
+        return False, msg, []
 
     logger.info("Running Maven compilation: mvn clean compile")
 
+    # Parse errors as lines arrive so the full log is never held in memory
     try:
-        result = subprocess.run(
+        returncode, output, timed_out, errors = stream_process(
             ["mvn", "clean", "compile"],
-            cwd=str(project_path),
-            capture_output=True,
-            text=True,
-            timeout=300,  # 5 minute timeout
+            project_path,
+            _TIMEOUT_SECONDS,
+            _parse_error_lines,
         )
-    except subprocess.TimeoutExpired:
-        msg = "Maven compilation timed out after 300 seconds"
-        logger.error(msg)
-        return False, msg
     except FileNotFoundError:
         msg = "Maven (mvn) not found on PATH"
         logger.error(msg)
-        return False, msg
+        return False, msg, []
 
-    combined_output = result.stdout + "\n" + result.stderr
-    success = result.returncode == 0
+    if timed_out:
+        msg = f"Maven compilation timed out after {_TIMEOUT_SECONDS} seconds"
+        logger.error(msg)
+        return False, msg, []
+
+    success = returncode == 0
 
     if success:
         logger.info("Compilation succeeded")
     else:
-        errors = parse_compilation_errors(combined_output)
         logger.error("Compilation failed with %d error(s)", len(errors))
         for err in errors[:10]:
             logger.error(
                 "  %s:%s — %s", err["file"], err["line"], err["message"]
             )
 
-    return success, combined_output
+    return success, output, errors
+
+
+def _error_from_match(match: re.Match) -> dict:
+    """Build the error dict for a _COMPILATION_ERROR_RE match."""
+    return {
+        "file": match.group(1),
+        "line": int(match.group(2)),
+        "column": int(match.group(3)),
+        "message": match.group(4).strip(),
+    }
+
+
+def _parse_error_lines(lines: Iterable[str]) -> list[dict]:
+    """Extract compilation errors from Maven output lines in a single pass."""
+    errors = []
+    for line in lines:
+        # Most of the log is [INFO]/[WARNING]; a substring find rejects it
+        # far faster than the regex, which then only has to anchor
+        start = line.find("[ERROR]")
+        if start == -1:
+            continue
+        match = _COMPILATION_ERROR_RE.match(line, start)
+        if match:
+            errors.append(_error_from_match(match))
+    return errors
 
 
 def parse_compilation_errors(maven_output: str) -> list[dict]:
@@ -71,17 +104,4 @@ def parse_compilation_errors(maven_output: str) -> list[dict]:
     Returns:
         List of dicts with keys: file, line, column, message
     """
-    errors = []
-    pattern = re.compile(
-        r"\[ERROR\]\s+(.+\.java):\[(\d+),(\d+)\]\s+(.*)"
-    )
-    for line in maven_output.splitlines():
-        match = pattern.search(line)
-        if match:
-            errors.append({
-                "file": match.group(1),
-                "line": int(match.group(2)),
-                "column": int(match.group(3)),
-                "message": match.group(4).strip(),
-            })
-    return errors
+    return _parse_error_lines(maven_output.splitlines())
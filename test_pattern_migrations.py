@@ -9,16 +9,23 @@ Usage:
 
 import json
 import logging
+import re
 import shutil
 import sys
 import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 from src.claude_fixer import _validate_java_syntax
-from src.migration_patterns.config_properties import find_config_files, migrate_config_file
-from src.migration_patterns.hibernate_six import find_hibernate_patterns, migrate_hibernate_file
-from src.claude_fixer import find_security_configs, migrate_security_config
+from src.migration_patterns.config_properties import (
+    _is_yaml_config,
+    find_config_files,
+    migrate_config_file_text,
+)
+from src.migration_patterns.hibernate_six import find_hibernate_patterns, migrate_hibernate_file_text
+from src.claude_fixer import find_security_configs, migrate_security_config_text
 from src.pattern_validators.security_validator import SecurityMigrationValidator
+from runner_utils import iter_java
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
@@ -28,6 +35,45 @@ logger = logging.getLogger(__name__)
 TEST_BASE = Path(__file__).parent / "test-cases"
 METRICS_FILE = Path(__file__).parent / "phase6_metrics.json"
 
+# Fewer migrated files than this are validated in-process
+VALIDATE_PARALLEL_MIN = 8
+
+
+# --- Validator check tables (built once, not per validated file) ---
+
+CONFIG_RENAMED_KEYS = (
+    ("spring.redis.", "spring.data.redis.", "spring.redis not renamed"),
+    ("spring.elasticsearch.rest.", "spring.elasticsearch.", "elasticsearch.rest not renamed"),
+    ("server.max-http-header-size", "server.max-http-request-header-size", "max-http-header-size not renamed"),
+)
+CONFIG_REMOVED_KEYS = (
+    "use-new-id-generator-mappings",
+    "use-legacy-processing",
+)
+CONFIG_DIALECT_UPGRADES = {
+    "MySQL5InnoDBDialect": "MySQLDialect",
+    "MySQL5Dialect": "MySQLDialect",
+    "PostgreSQL95Dialect": "PostgreSQLDialect",
+    "PostgreSQL9Dialect": "PostgreSQLDialect",
+}
+# One alternation over every key/dialect that must not survive migration, so a
+# text is swept once and each table entry becomes a set lookup. The renamed
+# keys' replacements get their own pattern because "spring.elasticsearch." is
+# a prefix of the stale "spring.elasticsearch.rest.".
+CONFIG_STALE_RE = re.compile("|".join(map(re.escape, (
+    *(old_key for old_key, _, _ in CONFIG_RENAMED_KEYS),
+    *CONFIG_REMOVED_KEYS,
+    *CONFIG_DIALECT_UPGRADES,
+))))
+CONFIG_NEW_KEY_RE = re.compile(
+    "|".join(re.escape(new_key) for _, new_key, _ in CONFIG_RENAMED_KEYS)
+)
+HIBERNATE_FIELD_MARKERS = ("private Long id", "private String name")
+HIBERNATE_DEPRECATED_DIALECTS = (
+    "MySQL5Dialect", "MySQL5InnoDBDialect", "MySQL8Dialect",
+    "PostgreSQL9Dialect", "PostgreSQL95Dialect",
+)
+
 
 # --- Validators ---
 
@@ -35,46 +81,26 @@ def validate_config_migration(original: str, migrated: str, is_yaml: bool) -> tu
     """Validate config property migration."""
     issues: list[str] = []
 
-    # Deprecated keys that should be removed or renamed
-    deprecated_checks = [
-        ("spring.redis.", "spring.data.redis.", "spring.redis not renamed"),
-        ("spring.elasticsearch.rest.", "spring.elasticsearch.", "elasticsearch.rest not renamed"),
-        ("server.max-http-header-size", "server.max-http-request-header-size", "max-http-header-size not renamed"),
-    ]
-
-    for old_key, new_key, msg in deprecated_checks:
-        if old_key in original:
-            if is_yaml:
-                # For YAML, check the leaf key
-                old_leaf = old_key.rstrip(".").split(".")[-1]
-                new_leaf = new_key.rstrip(".").split(".")[-1]
-                # Simple check: old nested key structure should be gone
-                if old_key in migrated and new_key not in migrated:
-                    issues.append(msg)
-            else:
-                if old_key in migrated and new_key not in migrated:
-                    issues.append(msg)
+    # Stale keys/dialects present both before and after migration
+    survived = frozenset(CONFIG_STALE_RE.findall(original)) & frozenset(
+        CONFIG_STALE_RE.findall(migrated)
+    )
+    new_keys = frozenset(CONFIG_NEW_KEY_RE.findall(migrated))
+
+    # Deprecated keys that should be renamed
+    for old_key, new_key, msg in CONFIG_RENAMED_KEYS:
+        if old_key in survived and new_key not in new_keys:
+            issues.append(msg)
 
     # Properties that should be removed entirely
-    remove_checks = [
-        "use-new-id-generator-mappings",
-        "use-legacy-processing",
-    ]
-    for key_fragment in remove_checks:
-        if key_fragment in original and key_fragment in migrated:
+    for key_fragment in CONFIG_REMOVED_KEYS:
+        if key_fragment in survived:
             issues.append(f"'{key_fragment}' should be removed")
 
     # Deprecated dialects should be updated
-    deprecated_dialects = {
-        "MySQL5InnoDBDialect": "MySQLDialect",
-        "MySQL5Dialect": "MySQLDialect",
-        "PostgreSQL95Dialect": "PostgreSQLDialect",
-        "PostgreSQL9Dialect": "PostgreSQLDialect",
-    }
-    for old_dialect, new_dialect in deprecated_dialects.items():
-        if old_dialect in original:
-            if old_dialect in migrated:
-                issues.append(f"Dialect '{old_dialect}' not updated to '{new_dialect}'")
+    for old_dialect, new_dialect in CONFIG_DIALECT_UPGRADES.items():
+        if old_dialect in survived:
+            issues.append(f"Dialect '{old_dialect}' not updated to '{new_dialect}'")
 
     # Custom properties should be preserved
     if "app." in original or "app:" in original:
@@ -103,17 +129,12 @@ def validate_hibernate_migration(original: str, migrated: str) -> tuple[bool, li
         if "javax.persistence" in migrated:
             issues.append("javax.persistence not converted to jakarta.persistence")
 
-    # org.hibernate.annotations.Type import should be removed (if @Type usage was removed)
-    if "import org.hibernate.annotations.Type;" in migrated and '@Type' not in migrated.split("import")[-1]:
-        # Only flag if there are no remaining @Type usages
-        pass
-
     # Entity structure preserved
     if "@Entity" in original and "@Entity" not in migrated:
         issues.append("@Entity annotation lost")
 
     # Field names preserved
-    for field_marker in ["private Long id", "private String name"]:
+    for field_marker in HIBERNATE_FIELD_MARKERS:
         if field_marker in original and field_marker not in migrated:
             issues.append(f"Field lost: {field_marker}")
 
@@ -123,9 +144,7 @@ def validate_hibernate_migration(original: str, migrated: str) -> tuple[bool, li
             issues.append("JSON @Type not converted to @JdbcTypeCode")
 
     # Deprecated dialects
-    deprecated_dialects = ["MySQL5Dialect", "MySQL5InnoDBDialect", "MySQL8Dialect",
-                           "PostgreSQL9Dialect", "PostgreSQL95Dialect"]
-    for d in deprecated_dialects:
+    for d in HIBERNATE_DEPRECATED_DIALECTS:
         if d in original and d in migrated:
             issues.append(f"Deprecated dialect '{d}' not updated")
 
@@ -134,8 +153,8 @@ def validate_hibernate_migration(original: str, migrated: str) -> tuple[bool, li
 
 # --- Test runners ---
 
-def test_config_files() -> list[dict]:
-    """Test config property migration on all test cases."""
+def test_config_files(pending: list[tuple[dict, tuple]]) -> list[dict]:
+    """Test config property migration on all test cases, queueing validation in pending."""
     test_dir = TEST_BASE / "config_properties"
     results = []
 
@@ -147,10 +166,10 @@ def test_config_files() -> list[dict]:
     for f in files:
         logger.info("Testing config: %s", f.name)
         original = f.read_text(encoding="utf-8")
-        is_yaml = f.suffix in (".yml", ".yaml")
+        is_yaml = _is_yaml_config(f.name)
 
         start = time.time()
-        success, migrated, tokens = migrate_config_file(f)
+        success, migrated, tokens = migrate_config_file_text(f.name, original)
         elapsed = round(time.time() - start, 2)
 
         result = {
@@ -167,24 +186,15 @@ def test_config_files() -> list[dict]:
             result["issues"].append(f"Migration failed: {migrated}")
             logger.error("  FAIL migration: %s", migrated)
         else:
-            is_valid, issues = validate_config_migration(original, migrated, is_yaml)
-            result["validation_passed"] = is_valid
-            result["issues"] = issues
-            if is_valid:
-                logger.info("  PASS (%d tokens, %.1fs)", tokens, elapsed)
-            else:
-                logger.error("  FAIL validation:")
-                for issue in issues:
-                    logger.error("    - %s", issue)
-                logger.info("  Migrated content:\n%s", migrated[:500])
+            pending.append((result, ("config", original, migrated, is_yaml)))
 
         results.append(result)
 
     return results
 
 
-def test_hibernate_files() -> list[dict]:
-    """Test Hibernate migration on all test cases."""
+def test_hibernate_files(pending: list[tuple[dict, tuple]]) -> list[dict]:
+    """Test Hibernate migration on all test cases, queueing validation in pending."""
     test_dir = TEST_BASE / "hibernate_patterns"
     results = []
 
@@ -198,7 +208,7 @@ def test_hibernate_files() -> list[dict]:
         original = f.read_text(encoding="utf-8")
 
         start = time.time()
-        success, migrated, tokens = migrate_hibernate_file(f)
+        success, migrated, tokens = migrate_hibernate_file_text(f.name, original)
         elapsed = round(time.time() - start, 2)
 
         result = {
@@ -216,25 +226,15 @@ def test_hibernate_files() -> list[dict]:
             result["issues"].append(f"Migration failed: {migrated}")
             logger.error("  FAIL migration: %s", migrated)
         else:
-            result["syntax_valid"] = _validate_java_syntax(migrated)
-            is_valid, issues = validate_hibernate_migration(original, migrated)
-            result["validation_passed"] = is_valid
-            result["issues"] = issues
-            if is_valid:
-                logger.info("  PASS (%d tokens, %.1fs)", tokens, elapsed)
-            else:
-                logger.error("  FAIL validation:")
-                for issue in issues:
-                    logger.error("    - %s", issue)
-                logger.info("  Migrated code:\n%s", migrated[:500])
+            pending.append((result, ("hibernate", original, migrated, False)))
 
         results.append(result)
 
     return results
 
 
-def test_security_files() -> list[dict]:
-    """Test security migration on all test cases (including new ones)."""
+def test_security_files(pending: list[tuple[dict, tuple]]) -> list[dict]:
+    """Test security migration on all test cases (including new ones), queueing validation in pending."""
     test_dir = TEST_BASE / "security_configs"
     results = []
 
@@ -242,15 +242,14 @@ def test_security_files() -> list[dict]:
         logger.warning("Security test directory not found: %s", test_dir)
         return results
 
-    validator = SecurityMigrationValidator()
-    files = sorted(test_dir.glob("*.java"))
+    files = sorted(iter_java(test_dir))
 
     for f in files:
         logger.info("Testing security: %s", f.name)
         original = f.read_text(encoding="utf-8")
 
         start = time.time()
-        success, migrated, tokens = migrate_security_config(f)
+        success, migrated, tokens = migrate_security_config_text(f.name, original)
         elapsed = round(time.time() - start, 2)
 
         result = {
@@ -268,41 +267,91 @@ def test_security_files() -> list[dict]:
             result["issues"].append(f"Migration failed: {migrated}")
             logger.error("  FAIL migration: %s", migrated)
         else:
-            result["syntax_valid"] = _validate_java_syntax(migrated)
-            is_valid, issues = validator.validate(original, migrated)
-            result["validation_passed"] = is_valid
-            result["issues"] = issues
-            if is_valid:
-                logger.info("  PASS (%d tokens, %.1fs)", tokens, elapsed)
-            else:
-                logger.error("  FAIL validation:")
-                for issue in issues:
-                    logger.error("    - %s", issue)
-                logger.info("  Migrated code:\n%s", migrated[:500])
+            pending.append((result, ("security", original, migrated, False)))
 
         results.append(result)
 
     return results
 
 
+# --- Validation ---
+
+def _validate_pair(pair: tuple[str, str, str, bool]) -> tuple[bool | None, bool, list[str]]:
+    """
+    Validate one (pattern, original, migrated, is_yaml) migration.
+
+    Module-level so a process pool can run it. Returns (syntax_valid,
+    is_valid, issues); syntax_valid is None for non-Java patterns.
+    """
+    pattern, original, migrated, is_yaml = pair
+    if pattern == "config":
+        return None, *validate_config_migration(original, migrated, is_yaml)
+    syntax_valid = _validate_java_syntax(migrated)
+    if pattern == "hibernate":
+        return syntax_valid, *validate_hibernate_migration(original, migrated)
+    return syntax_valid, *SecurityMigrationValidator().validate(original, migrated)
+
+
+def validate_pending(pending: list[tuple[dict, tuple]]) -> None:
+    """
+    Validate every queued migration and merge the outcome into its result.
+
+    The validators are pure CPU work, so with at least VALIDATE_PARALLEL_MIN
+    files they run across a process pool.
+    """
+    pairs = [pair for _, pair in pending]
+    if len(pairs) >= VALIDATE_PARALLEL_MIN:
+        with ProcessPoolExecutor() as pool:
+            validations = list(pool.map(_validate_pair, pairs))
+    else:
+        validations = [_validate_pair(pair) for pair in pairs]
+
+    for (result, pair), (syntax_valid, is_valid, issues) in zip(pending, validations):
+        migrated = pair[2]
+        if syntax_valid is not None:
+            result["syntax_valid"] = syntax_valid
+        result["validation_passed"] = is_valid
+        result["issues"] = issues
+        if is_valid:
+            logger.info(
+                "  PASS [%s] %s (%d tokens, %.1fs)",
+                result["pattern"],
+                result["name"],
+                result["tokens_used"],
+                result["time_seconds"],
+            )
+        else:
+            logger.error("  FAIL validation [%s] %s:", result["pattern"], result["name"])
+            for issue in issues:
+                logger.error("    - %s", issue)
+            # Arguments are evaluated eagerly, so only slice when INFO is emitted
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("  Migrated content:\n%s", migrated[:500])
+
+
 def main() -> None:
     logger.info("=" * 60)
     logger.info("Phase 6: Pattern Migration Tests")
     logger.info("=" * 60)
 
     all_results = []
+    pending: list[tuple[dict, tuple]] = []
 
     # Config properties
     logger.info("\n--- Config Properties ---")
-    all_results.extend(test_config_files())
+    all_results.extend(test_config_files(pending))
 
     # Hibernate
     logger.info("\n--- Hibernate 6 ---")
-    all_results.extend(test_hibernate_files())
+    all_results.extend(test_hibernate_files(pending))
 
     # Security (includes existing + new test cases)
     logger.info("\n--- Security ---")
-    all_results.extend(test_security_files())
+    all_results.extend(test_security_files(pending))
+
+    # Validate every successful migration in one pass
+    logger.info("\n--- Validation ---")
+    validate_pending(pending)
 
     # Build metrics
     passed = sum(1 for r in all_results if r["validation_passed"])
@@ -334,7 +383,9 @@ def main() -> None:
         },
     }
 
-    METRICS_FILE.write_text(json.dumps(metrics, indent=2), encoding="utf-8")
+    # json.dump streams the encoder's chunks instead of building one string
+    with METRICS_FILE.open("w", encoding="utf-8") as fp:
+        json.dump(metrics, fp, indent=2)
     logger.info("Metrics written to %s", METRICS_FILE)
 
     # Summary
@@ -13,8 +13,9 @@ import sys
 import time
 from pathlib import Path
 
-from src.claude_fixer import migrate_security_config, _validate_java_syntax
+from src.claude_fixer import migrate_security_config_text, _validate_java_syntax
 from src.pattern_validators.security_validator import SecurityMigrationValidator
+from runner_utils import iter_java
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
@@ -34,7 +35,7 @@ def test_single_config(
     original_code = test_file.read_text(encoding="utf-8")
 
     start = time.time()
-    success, migrated_code, tokens_used = migrate_security_config(test_file)
+    success, migrated_code, tokens_used = migrate_security_config_text(test_file.name, original_code)
     elapsed = round(time.time() - start, 2)
 
     result = {
@@ -76,7 +77,7 @@ def main() -> None:
         logger.error("Test directory not found: %s", TEST_DIR)
         sys.exit(1)
 
-    test_files = sorted(TEST_DIR.glob("*.java"))
+    test_files = sorted(iter_java(TEST_DIR))
     if not test_files:
         logger.error("No test files found in %s", TEST_DIR)
         sys.exit(1)
@@ -112,7 +113,8 @@ def main() -> None:
         },
     }
 
-    METRICS_FILE.write_text(json.dumps(metrics, indent=2), encoding="utf-8")
+    with METRICS_FILE.open("w", encoding="utf-8") as fp:
+        json.dump(metrics, fp, indent=2)
     logger.info("Metrics written to %s", METRICS_FILE)
 
     # Summary